@@ -1,7 +1,11 @@
 from board import *
+from transposition import *
+from mcts import MCTSTree, merge_root_stats, root_search_task
+from symmetry import canonical_key, inverse_move, transform_move
 import numpy as np
 import time
-import random
+import threading
+import multiprocessing
 
 class Agent(object):
   def get_player(self):
@@ -13,251 +17,605 @@ class Agent(object):
   def reset(self):
     pass
 
+def make_rng(seed):
+  """
+  Returns the global np.random if seed is None, else a RandomState seeded
+  with it, so agents given a seed play the same way on every run.
+  """
+  return np.random if seed is None else np.random.RandomState(seed)
+
 class RandomAgent(Agent):
-  def __init__(self, player):
+  def __init__(self, player, seed=None):
     self.player = player
+    self.seed = seed
+    self.rng = make_rng(seed)
 
   def get_player(self):
     return self.player
 
   def make_move(self, board):
-    potential_moves = board.availible_moves_numpy()
-    choice = np.random.choice(potential_moves.shape[0], 1)[0]
-    move = potential_moves[choice]
+    choice = self.rng.randint(board.num_availible_moves())
+    move = board.nth_availible_move(choice)
     board.move(move, self.player)
     return move
 
+# deeper than any game can last
+MAX_PLY = 128
+# nodes searched between two checks of the deadline
+CHECK_EVERY = 64
+
+class SearchTimeout(Exception):
+  """
+  Raised inside a search when its deadline has passed or its node budget
+  is used up.
+  """
+  pass
+
+def effective_branching_factor(nodes_per_depth):
+  """
+  Returns the growth in nodes between the last two iterations of an
+  iterative deepening search.
+  """
+  if len(nodes_per_depth) < 2 or nodes_per_depth[-2] == 0:
+    return float(nodes_per_depth[-1]) if nodes_per_depth else 0.0
+  return nodes_per_depth[-1] / nodes_per_depth[-2]
+
+def play_book_move(agent, board):
+  """
+  Plays the move of agent's opening book for board, if it has one, and
+  returns whether it did.
+  """
+  if agent.book is None:
+    return False
+  time_s = time.time()
+  move = agent.book.lookup(board)
+  if move is None:
+    return False
+  board.move(move, agent.player)
+  agent.search_info = {"book": True, "move": move, "nodes": 0, "time": time.time() - time_s}
+  return True
+
 class TimedMinmaxAgent(Agent):
-  def __init__(self, player, max_time, end_value, heuristic):
+  def __init__(self, player, max_time, end_value, heuristic, tt_size=2**16, max_nodes=None, seed=None,
+      book=None, symmetric_tt=False, ponder=False):
+    if max_time is None and max_nodes is None:
+      raise ValueError("TimedMinmaxAgent needs a max_time or a max_nodes budget")
     self.player = player
+    # seconds per move, None to only stop on max_nodes
     self.max_time = max_time
+    # nodes searched per move, None to only stop on max_time
+    self.max_nodes = max_nodes
+    # the search itself is deterministic, seed is accepted like for the
+    # other agents and only kept for game records
+    self.seed = seed
     self.end_value = end_value
     self.heuristic = heuristic
+    # transposition table kept between depths and moves, None to disable
+    self.tt = TranspositionTable(tt_size) if tt_size else None
+    # key the table on the canonical form of positions, so the 8 images of
+    # a position share one entry
+    self.symmetric_tt = symmetric_tt
+    # principal variation of the last completed iteration, killer moves per
+    # ply and history scores per player, all used to order moves
+    self.pv = []
+    self.killers = [[None, None] for _ in range(MAX_PLY)]
+    self.history = {1: {}, -1: {}}
+    self.deadline = float("inf")
+    self.node_limit = float("inf")
+    # OpeningBook whose moves are played without searching, or None
+    self.book = book
+    # keep searching the expected reply in a background thread between
+    # moves, see start_pondering. The thread competes for the GIL with any
+    # search in the same process, so it only pays against a human
+    self.ponder = ponder
+    self.ponder_thread = None
+    self.pondering = None
+    self.search_info = {}
 
   def get_player(self):
     return self.player
 
   def make_move(self, board):
     s_time = time.time()
+    pondered = self.stop_pondering(board)
+    if play_book_move(self, board):
+      return self.search_info["move"]
+
+    self.deadline = s_time + self.max_time if self.max_time is not None else float("inf")
+    if self.tt is not None:
+      self.tt.new_search()
+      self.tt.reset_stats()
+    self.new_search()
+    max_nodes = self.max_nodes
+    if pondered is not None and max_nodes is not None:
+      # the nodes searched while pondering count against the budget
+      max_nodes = max(0, max_nodes - pondered["nodes"])
+    best_move, score, depth, nodes_per_depth, aborted = self.deepen(board, max_nodes)
+    if pondered is not None and pondered["depth"] > depth:
+      best_move, score, depth, self.pv = pondered["move"], pondered["score"], pondered["depth"], pondered["pv"]
+
+    if best_move is None:
+      # not even depth 1 finished in time
+      _, _, tt_move, _ = self.probe_tt(board, float("-inf"), float("inf"), 0)
+      best_move = self.ordered_moves(board, 0, tt_move, self.player)[0]
+
+    elapsed = time.time() - s_time
+    self.search_info = {
+      "depth": depth,
+      "score": score,
+      "pv": self.pv,
+      "time": elapsed,
+      "budget": self.max_time,
+      "overrun": elapsed - self.max_time if self.max_time is not None else 0.0,
+      "node_budget": self.max_nodes,
+      "aborted": aborted,
+      "nodes": sum(nodes_per_depth),
+      "nodes_per_depth": nodes_per_depth,
+      "ebf": effective_branching_factor(nodes_per_depth[:depth]),
+      "pondered_nodes": pondered["nodes"] if pondered is not None else 0,
+    }
+    if self.tt is not None:
+      self.search_info["tt_probes"] = self.tt.probes
+      self.search_info["tt_hit_rate"] = self.tt.hit_rate()
+    board.move(best_move, self.player)
+    self.start_pondering(board)
+    return best_move
+
+  def deepen(self, board, max_nodes):
+    """
+    Searches board one depth deeper at a time until the deadline passes,
+    max_nodes nodes are searched (None for no limit) or the whole game
+    tree is searched. Returns the best move and score of the deepest
+    completed iteration, its depth, the nodes of every iteration and
+    whether the last one was cut short.
+    """
+    limit = float("inf") if max_nodes is None else max_nodes
+    searched = 0
+    start_moves = len(board.history)
+    nodes_per_depth = []
+    best_move, score = None, None
+    aborted = False
     depth = 0
-    while (time.time() - s_time) < self.max_time:
-      depth += 1
+    while time.time() < self.deadline and searched < limit:
       alpha = float("-inf")
       beta = float("inf")
-      score, best_move = self.maximize(board.copy(), alpha, beta, depth, None)
-    board.move(np.asarray(best_move), self.player)
-    return best_move
+      self.node_limit = limit - searched
+      self.nodes = 0
+      self.follow_pv = True
+      self.horizon = False
+      try:
+        iter_score, iter_move = self.maximize(board, alpha, beta, depth + 1, 0)
+      except SearchTimeout:
+        # take back the moves of the unfinished iteration and keep the
+        # result of the last completed one
+        while len(board.history) > start_moves:
+          board.undo_move(board.history[-1])
+        nodes_per_depth.append(self.nodes)
+        aborted = True
+        break
+      searched += self.nodes
+      depth += 1
+      score, best_move = iter_score, iter_move
+      self.pv = self.pv_lines[0][:]
+      nodes_per_depth.append(self.nodes)
+      if not self.horizon:
+        # every line was searched to the end of the game, deeper
+        # iterations would return the same result
+        break
+    return best_move, score, depth, nodes_per_depth, aborted
+
+  def start_pondering(self, board):
+    """
+    If pondering is on, starts searching the position after the reply the
+    principal variation expects in a background thread, filling the
+    transposition table. It runs until stop_pondering.
+    """
+    if not self.ponder or len(self.pv) < 2 or board.result != 0:
+      return
+    ponder_board = board.copy()
+    ponder_board.move(self.pv[1], -self.player)
+    if ponder_board.result != 0:
+      return
+    self.deadline = float("inf")
+    self.pondering = {"key": ponder_board.key, "move": None}
+    self.ponder_thread = threading.Thread(target=self._ponder, args=(ponder_board,), daemon=True)
+    self.ponder_thread.start()
+
+  def _ponder(self, board):
+    if self.tt is not None:
+      self.tt.new_search()
+    self.new_search()
+    best_move, score, depth, nodes_per_depth, _ = self.deepen(board, None)
+    self.pondering.update(move=best_move, score=score, depth=depth, nodes=sum(nodes_per_depth), pv=self.pv)
+
+  def stop_pondering(self, board=None):
+    """
+    Stops the background search, and returns its result if it searched
+    board, else None.
+    """
+    if self.ponder_thread is None:
+      return None
+    # the search checks the deadline every CHECK_EVERY nodes
+    self.deadline = 0
+    self.ponder_thread.join()
+    self.ponder_thread = None
+    result, self.pondering = self.pondering, None
+    if board is None or result["move"] is None or result["key"] != board.key:
+      return None
+    return result
+
+  def close(self):
+    self.stop_pondering()
 
-  def maximize(self, board, alpha, beta, depth, move):
+  def reset(self):
+    self.stop_pondering()
+    if self.tt is not None:
+      self.tt.clear()
+    self.pv = []
+    self.history = {1: {}, -1: {}}
+
+  def new_search(self):
+    self.pv = []
+    self.follow_pv = False
+    self.killers = [[None, None] for _ in range(MAX_PLY)]
+    self.pv_lines = [[] for _ in range(MAX_PLY + 1)]
+    # keep the history ordering of earlier moves, at a lower weight
+    for table in self.history.values():
+      for move in table:
+        table[move] //= 2
+
+  def probe_tt(self, board, alpha, beta, depth):
+    """
+    Returns (cutoff, score, move, horizon): whether the stored result for
+    board settles this node, its score, the stored best move to try first
+    and whether the stored search stopped at the depth limit.
+    """
+    if self.tt is None:
+      return False, None, None, True
+    if self.symmetric_tt:
+      key, s = canonical_key(board)
+    else:
+      key, s = board.key, 0
+    entry = self.tt.probe(key)
+    if entry is None:
+      return False, None, None, True
+    tt_depth, flag, score, tt_move, horizon = entry
+    if s and tt_move is not None:
+      # stored for the canonical image of board
+      tt_move = inverse_move(tt_move, s, board.dim)
+    if tt_depth >= depth and tt_move is not None:
+      if flag == EXACT or (flag == LOWER and score >= beta) or (flag == UPPER and score <= alpha):
+        return True, score, tt_move, horizon
+    return False, score, tt_move, horizon
+
+  def store_tt(self, board, alpha, beta, depth, best_val, best_move, horizon=True):
+    if self.tt is None:
+      return
+    if best_val <= alpha:
+      flag = UPPER
+    elif best_val >= beta:
+      flag = LOWER
+    else:
+      flag = EXACT
+    if self.symmetric_tt:
+      key, s = canonical_key(board)
+      if s and best_move is not None:
+        best_move = transform_move(best_move, s, board.dim)
+    else:
+      key = board.key
+    self.tt.store(key, depth, flag, best_val, best_move, horizon)
+
+  def ordered_moves(self, board, ply, tt_move, player):
+    """
+    Returns the legal moves in the order they should be searched: the
+    previous iteration's PV move, the TT move, the killer moves, then the
+    rest by history score.
+    """
+    moves = board.availible_moves()
+    history = self.history[player]
+    if history:
+      moves.sort(key=lambda move: -history.get(move, 0))
+
+    pv_move = None
+    if self.follow_pv:
+      if ply < len(self.pv) and self.pv[ply] in moves:
+        pv_move = self.pv[ply]
+      else:
+        self.follow_pv = False
+    first = []
+    for move in (pv_move, tt_move, self.killers[ply][0], self.killers[ply][1]):
+      if move is not None and move not in first and move in moves:
+        first.append(move)
+    if not first:
+      return moves
+    for move in first:
+      moves.remove(move)
+    return first + moves
+
+  def record_cutoff(self, move, ply, depth, player):
+    killers = self.killers[ply]
+    if killers[0] != move:
+      killers[1] = killers[0]
+      killers[0] = move
+    history = self.history[player]
+    history[move] = history.get(move, 0) + depth * depth
+
+  def maximize(self, board, alpha, beta, depth, ply):
+    self.nodes += 1
+    if self.nodes > self.node_limit or (self.nodes % CHECK_EVERY == 0 and time.time() > self.deadline):
+      raise SearchTimeout()
+    self.pv_lines[ply] = []
 
     # leaf node
     # finished playthrough
     if board.result != 0:
-      result_score = self.end_value(board.result) * self.player
-      board.undo_move(move)
-      return result_score, None
+      return self.end_value(board.result) * self.player, None
     # reached determined max depth
     elif depth == 0:
-      board_score = self.heuristic(board) * self.player
-      board.undo_move(move)
-      return board_score, None
+      self.horizon = True
+      return self.heuristic(board) * self.player, None
+
+    cutoff, tt_score, tt_move, tt_horizon = self.probe_tt(board, alpha, beta, depth)
+    if cutoff:
+      if tt_horizon:
+        self.horizon = True
+      self.pv_lines[ply] = [tt_move]
+      return tt_score, tt_move
+
+    # whether this node's subtree reaches the depth limit, stored with it
+    outer_horizon = self.horizon
+    self.horizon = False
 
     # not leaf node
     a, b = alpha, beta
 
     best_val = float('-inf')
     best_move = None
-    valid_moves = board.availible_moves_numpy()
-    for i in range(valid_moves.shape[0]):
-      made_move = (valid_moves[i,0], valid_moves[i,1], valid_moves[i,2], valid_moves[i,3])
+    for made_move in self.ordered_moves(board, ply, tt_move, self.player):
       board.move(made_move, self.player)
-      move_val, min_move = self.minimize(board, a, b, depth-1, made_move)
+      move_val, min_move = self.minimize(board, a, b, depth-1, ply+1)
+      board.undo_move(made_move)
+      # only the first move searched can continue the previous PV
+      self.follow_pv = False
 
       # maximize out of options
       if move_val > best_val:
         best_val = move_val
         best_move = made_move
+        self.pv_lines[ply] = [made_move] + self.pv_lines[ply+1]
 
       # beta pruning
       if best_val >= b:
-        board.undo_move(move)
-        return best_val, best_move
+        self.record_cutoff(made_move, ply, depth, self.player)
+        break
 
       a = max(a, move_val)
-    
-    board.undo_move(move)
+
+    self.store_tt(board, alpha, beta, depth, best_val, best_move, self.horizon)
+    self.horizon = self.horizon or outer_horizon
     return best_val, best_move
-    
-  def minimize(self, board, alpha, beta, depth, move):
+
+  def minimize(self, board, alpha, beta, depth, ply):
+    self.nodes += 1
+    if self.nodes > self.node_limit or (self.nodes % CHECK_EVERY == 0 and time.time() > self.deadline):
+      raise SearchTimeout()
+    self.pv_lines[ply] = []
 
     # leaf node
     # finished playthrough
     if board.result != 0:
-      result_score = self.end_value(board.result) * self.player
-      board.undo_move(move)
-      return result_score, None
+      return self.end_value(board.result) * self.player, None
     # reached determined max depth
     elif depth == 0:
-      board_score = self.heuristic(board) * self.player
-      board.undo_move(move)
-      return board_score, None
+      self.horizon = True
+      return self.heuristic(board) * self.player, None
+
+    cutoff, tt_score, tt_move, tt_horizon = self.probe_tt(board, alpha, beta, depth)
+    if cutoff:
+      if tt_horizon:
+        self.horizon = True
+      self.pv_lines[ply] = [tt_move]
+      return tt_score, tt_move
+
+    # whether this node's subtree reaches the depth limit, stored with it
+    outer_horizon = self.horizon
+    self.horizon = False
 
     # not leaf node
     a, b = alpha, beta
 
     best_val = float('inf')
     best_move = None
-    valid_moves = board.availible_moves_numpy()
-    for i in range(valid_moves.shape[0]):
-      made_move = (valid_moves[i,0], valid_moves[i,1], valid_moves[i,2], valid_moves[i,3])
+    for made_move in self.ordered_moves(board, ply, tt_move, -self.player):
       board.move(made_move, -self.player)
-      move_val, max_move = self.maximize(board, a, b, depth-1, made_move)
+      move_val, max_move = self.maximize(board, a, b, depth-1, ply+1)
+      board.undo_move(made_move)
+      # only the first move searched can continue the previous PV
+      self.follow_pv = False
 
       # minimize out of options
       if move_val < best_val:
         best_val = move_val
         best_move = made_move
+        self.pv_lines[ply] = [made_move] + self.pv_lines[ply+1]
 
       # alpha pruning
       if best_val <= a:
-        board.undo_move(move)
-        return best_val, best_move
+        self.record_cutoff(made_move, ply, depth, -self.player)
+        break
 
       b = min(b, move_val)
-    
-    board.undo_move(move)
+
+    self.store_tt(board, alpha, beta, depth, best_val, best_move, self.horizon)
+    self.horizon = self.horizon or outer_horizon
     return best_val, best_move
 
 class TimedMCTSAgent(Agent):
-  def __init__(self, player, max_time, c):
+  def __init__(self, player, max_time, c, max_nodes=None, parallel=None, workers=1, batch_size=None,
+      playouts_per_leaf=1, max_iterations=None, seed=None, book=None, symmetric=False, ponder=False,
+      cache=None):
+    if max_time is None and max_iterations is None:
+      raise ValueError("TimedMCTSAgent needs a max_time or a max_iterations budget")
     self.player = player
+    # seconds and iterations per move, whichever runs out first; None for
+    # no limit of that kind
     self.max_time = max_time
+    self.max_iterations = max_iterations
+    self.seed = seed
+    self.rng = make_rng(seed)
     self.c = c
-    self.root = None
+    # cap on the number of tree nodes, None for no cap
+    self.max_nodes = max_nodes
+    # random playouts per leaf, played as one vectorised batch when above 1
+    self.playouts_per_leaf = playouts_per_leaf
+    # expand one child per class of equivalent moves in symmetric positions
+    self.symmetric = symmetric
+    # PositionCache of playout results shared with other searches, or None
+    self.cache = cache
+    # None for a single-process search, "root" for one independent tree per
+    # worker, "leaf" for one tree whose playouts run in batches on the workers
+    if parallel not in (None, "root", "leaf"):
+      raise ValueError("parallel must be None, 'root' or 'leaf', not {!r}".format(parallel))
+    self.parallel = parallel
+    self.workers = workers
+    self.batch_size = batch_size if batch_size else 2 * workers
+    self.pool = None
+    self.tree = None
+    # OpeningBook whose moves are played without searching, or None
+    self.book = book
+    # keep growing the tree in a background thread between moves, see
+    # start_pondering; like minmax pondering, meant for play against a
+    # human, as it slows down other searches in the process
+    self.ponder = ponder
+    self.ponder_thread = None
+    self.ponder_stop = None
+    # plies of the pondered position and visits of its children when
+    # pondering started, to tell the playouts pondering added
+    self.ponder_start = None
+    self.search_info = {}
 
   def get_player(self):
     return self.player
 
+  def get_pool(self):
+    if self.pool is None:
+      self.pool = multiprocessing.Pool(self.workers)
+    return self.pool
+
+  def close(self):
+    self.stop_pondering()
+    if self.pool is not None:
+      self.pool.terminate()
+      self.pool = None
+
   def make_move(self, board):
+    self.stop_pondering()
+    ponder_start, self.ponder_start = self.ponder_start, None
+    if play_book_move(self, board):
+      # the tree doesn't know the book moves
+      self.tree = None
+      return self.search_info["move"]
+    if self.parallel == "root":
+      return self.make_move_root_parallel(board)
+
     time_s = time.time()
 
-    if self.root == None:
-      self.root = Node(-self.player, board.copy(), None, self.c, None)
+    # reuse the subtree of the position the opponent moved to
+    if self.tree is not None and not self.tree.advance(board):
+      self.tree = None
+    if self.tree is None:
+      self.tree = self.new_tree(board)
+
+    start_visits = int(self.tree.visits[0])
+    pondered = 0
+    if ponder_start is not None and start_visits and len(board.history) == ponder_start[0] + 1:
+      # the reply's visits from earlier searches were already paid for
+      reply = self.tree.encode_move(board.played_move(-1))
+      pondered = start_visits - ponder_start[1].get(reply, 0)
+    max_iterations = self.max_iterations
+    if max_iterations is not None:
+      # playouts made while pondering count against the budget
+      max_iterations = max(0, max_iterations - pondered // self.playouts_per_leaf)
+    pool = self.get_pool() if self.parallel == "leaf" else None
+    iterations = self.tree.search(self.max_time, max_iterations, pool, self.batch_size)
+    self.search_info = {
+      "iterations": iterations,
+      "playouts": int(self.tree.visits[0]) - start_visits,
+      "reused_playouts": start_visits,
+      "pondered_playouts": pondered,
+      "nodes": self.tree.size,
+      "time": time.time() - time_s,
+    }
+
+    best_child = self.tree.best_child(0)
+
+    if best_child == -1:
+      choice = self.rng.randint(board.num_availible_moves())
+      move = board.nth_availible_move(choice)
+      self.tree = None
     else:
-      found = False
-      for child in self.root.children:
-        if np.all(child.board.get_state() == board.get_state()):
-          found = True
-          self.root = child
-          break
-      if not found:
-        self.root = Node(-self.player, board.copy(), None, self.c, None)
-    while (time.time() - time_s) < self.max_time:
-      selected_node = self.root.select_node()
-      expanded_node = selected_node.expand_node()
-      expanded_node.playout()
-
-    best_uct = -1
-    best_child = None
-    for child in self.root.children:
-      child_uct = child.uct()
-      if child_uct > best_uct:
-        best_child = child
-        best_uct = child_uct
-
-    self.root = best_child
-
-    if best_child == None:
-      potential_moves = board.availible_moves_numpy()
-      choice = np.random.choice(potential_moves.shape[0], 1)[0]
-      move = potential_moves[choice]
+      move = self.tree.decode_move(self.tree.move[best_child])
+      self.tree.reroot(best_child)
+    board.move(move, self.player)
+    self.start_pondering()
+    return move
+
+  def start_pondering(self):
+    """
+    If pondering is on, keeps searching the tree of the position after
+    this agent's move in a background thread until stop_pondering, so the
+    subtree of the opponent's reply has grown when the next move starts.
+    """
+    if not self.ponder or self.parallel is not None or self.tree is None or self.tree.board.result != 0:
+      return
+    first = self.tree.first_child[0]
+    children = range(first, first + self.tree.num_children[0])
+    self.ponder_start = (len(self.tree.board.history),
+      {int(self.tree.move[child]): int(self.tree.visits[child]) for child in children})
+    self.ponder_stop = threading.Event()
+    self.ponder_thread = threading.Thread(target=self.tree.search, kwargs={"stop": self.ponder_stop},
+      daemon=True)
+    self.ponder_thread.start()
+
+  def stop_pondering(self):
+    if self.ponder_thread is None:
+      return
+    self.ponder_stop.set()
+    self.ponder_thread.join()
+    self.ponder_thread = None
+
+  def new_tree(self, board):
+    return MCTSTree(board, -self.player, self.c, self.max_nodes, self.playouts_per_leaf, self.rng, self.symmetric,
+      self.cache)
+
+  def make_move_root_parallel(self, board):
+    time_s = time.time()
+    tasks = []
+    for worker in range(self.workers):
+      # the iteration budget is split between the trees
+      iterations = None
+      if self.max_iterations is not None:
+        iterations = self.max_iterations // self.workers + (worker < self.max_iterations % self.workers)
+      tasks.append((board, -self.player, self.c, self.max_time, iterations, self.max_nodes,
+        self.playouts_per_leaf, self.rng.randint(2**31), self.symmetric))
+    merged = merge_root_stats(self.get_pool().map(root_search_task, tasks))
+    playouts = sum(stats[0] for stats in merged.values())
+    self.search_info = {
+      "iterations": playouts // self.playouts_per_leaf,
+      "playouts": playouts,
+      "time": time.time() - time_s,
+    }
+
+    if merged:
+      # the most visited move over all trees
+      move = max(merged, key=lambda move: merged[move][0])
     else:
-      move = best_child.move
+      choice = self.rng.randint(board.num_availible_moves())
+      move = board.nth_availible_move(choice)
     board.move(move, self.player)
     return move
 
   def reset(self):
-    self.root = None
-
-class Node():
-  def __init__(self, player, board, move, c, parent):
-    # who made the last move
-    self.player = player
-    self.board = board
-    self.move = move
-    self.c = c
-    self.parent = parent
-    self.wins = 0
-    self.losses = 0
-    self.ties = 0
-    self.visits = 0
-    self.is_leaf = True
-    self.children = []
-
-  def uct(self):
-    if self.visits == 0:
-      return float("inf")
-
-    n = self.visits
-    w = self.wins
-    t = self.ties * .5
-    N = self.parent.visits
-
-    return (w+t)/n + self.c * np.sqrt(np.log(N)/n)
-
-  # traverses the tree to find the next node to do a game from
-  def select_node(self):
-    if self.is_leaf:
-      selection = self
-    else:
-      max_uct = -1
-      next_node = None
-      for child in self.children:
-        child_uct = child.uct()
-        if child_uct > max_uct:
-          next_node = child
-          max_uct = child_uct
-      selection = next_node.select_node()
-
-    return selection
-
-  def expand_node(self):
-    if self.board.result != 0:
-      return self
-    elif self.visits == 0:
-      return self
-    else:
-      self.is_leaf = False
-      valid_moves = self.board.availible_moves_numpy()
-      for i in range(valid_moves.shape[0]):
-        child_player = -self.player
-        child_board = self.board.copy()
-        child_board.move(valid_moves[i,:], child_player)
-        child_node = Node(child_player, child_board, valid_moves[i,:], self.c, parent=self)
-        self.children.append(child_node)
-
-      return random.choice(self.children)
-
-  def playout(self):
-    board = self.board.copy()
-    player = -self.player
-    while board.result == 0:
-      valid_moves = board.availible_moves_numpy()
-      player = -player
-      choice = np.random.choice(valid_moves.shape[0], 1)[0]
-      selected_move = valid_moves[choice]
-      board.move(selected_move, player)
-
-    self.backpropogate(board.result)
-
-  def backpropogate(self, winner):
-    curr_node = self
-    while curr_node is not None:
-      curr_node.visits +=1
-      if winner == -2:
-        curr_node.ties += 1
-      elif curr_node.player == winner:
-        curr_node.wins += 1
-      else:
-        curr_node.losses += 1
-      curr_node = curr_node.parent
\ No newline at end of file
+    self.stop_pondering()
+    self.ponder_start = None
+    self.tree = None
@@ -0,0 +1,174 @@
+from board import *
+from agents import *
+from heuristics import *
+from tournament import make_agent, play_game, pairing
+import argparse
+import json
+import math
+import platform
+import subprocess
+import timeit
+
+def fixed_positions(plies=(0, 10, 20, 30), seed=0):
+  """
+  Returns (plies, board, player to move) for boards reached by seeded
+  random play after each number of plies, the same on every run.
+  """
+  rng = np.random.RandomState(seed)
+  positions = []
+  for num_plies in plies:
+    while True:
+      board = Board(3)
+      player = 1
+      for _ in range(num_plies):
+        if board.result != 0:
+          break
+        board.move(board.nth_availible_move(rng.randint(board.num_availible_moves())), player)
+        player = -player
+      if board.result == 0:
+        positions.append((num_plies, board, player))
+        break
+  return positions
+
+def time_op(fun, number):
+  # best of 3 runs, in nanoseconds per call
+  return min(timeit.repeat(fun, number=number, repeat=3)) / number * 1e9
+
+def micro_benchmarks(number=2000):
+  """
+  Returns the ns per call of the board operations on every fixed position,
+  for both board backends.
+  """
+  results = {}
+  for board_class in (Board, BitBoard):
+    for num_plies, position, player in fixed_positions():
+      # replay the position on this backend
+      board = board_class(3)
+      for entry in position.history:
+        board.move(entry[:4], entry[4])
+      move = board.availible_moves()[0]
+
+      def move_undo():
+        board.move(move, player)
+        board.undo_move(move)
+
+      name = "{}/ply{}".format(board_class.__name__, num_plies)
+      results[name + "/move+undo_move"] = time_op(move_undo, number)
+      results[name + "/copy"] = time_op(board.copy, number)
+      results[name + "/availible_moves"] = time_op(board.availible_moves, number)
+      results[name + "/availible_moves_numpy"] = time_op(board.availible_moves_numpy, number)
+      results[name + "/num_availible_moves"] = time_op(board.num_availible_moves, number)
+      if board_class is Board:
+        local = board.board[move[0], move[1]]
+        results[name + "/compute_outcome"] = time_op(lambda: board.compute_outcome(local), number)
+  return results
+
+def throughput_benchmarks(seconds=1.0):
+  """
+  Returns MCTS iterations/s and minimax nodes/s on every fixed position.
+  """
+  results = {}
+  for num_plies, board, player in fixed_positions():
+    tree = MCTSTree(board, -player, 1, rng=np.random.RandomState(0))
+    time_s = time.time()
+    iterations = tree.search(max_time=seconds)
+    results["mcts/ply{}/iterations_per_s".format(num_plies)] = iterations / (time.time() - time_s)
+
+    for name in ("plus", "plus_neg", "attack"):
+      agent = make_agent({"type": "minmax", "max_time": seconds, "heuristic": name}, player)
+      agent.make_move(board.copy())
+      info = agent.search_info
+      results["minmax_{}/ply{}/nodes_per_s".format(name, num_plies)] = info["nodes"] / info["time"]
+      results["minmax_{}/ply{}/depth".format(name, num_plies)] = info["depth"]
+  return results
+
+def elo_from_score(score):
+  score = min(max(score, 1e-6), 1 - 1e-6)
+  return -400 * math.log10(1 / score - 1)
+
+def strength_benchmark(spec, opponent_spec, num_games, z=1.96):
+  """
+  Plays spec against opponent_spec, half of the games as X, and returns
+  its score (ties count half) and Elo difference with confidence
+  intervals for the given z.
+  """
+  wins = losses = ties = 0
+  for game in range(num_games):
+    player = 1 if game % 2 == 0 else -1
+    record = play_game((pairing("strength", spec, player, opponent_spec), game))
+    if record["outcome"] == 0:
+      wins += 1
+    elif record["outcome"] == 1:
+      losses += 1
+    else:
+      ties += 1
+
+  score = (wins + .5 * ties) / num_games
+  # Wilson interval, treating the score as a binomial proportion, which
+  # overstates the variance when there are ties and stays sensible at 0 or 1
+  n = num_games
+  center = (score + z * z / (2 * n)) / (1 + z * z / n)
+  margin = z * math.sqrt(score * (1 - score) / n + z * z / (4 * n * n)) / (1 + z * z / n)
+  low, high = center - margin, center + margin
+  return {
+    "games": num_games,
+    "wins": wins,
+    "losses": losses,
+    "ties": ties,
+    "score": score,
+    "score_ci": [low, high],
+    "elo": elo_from_score(score),
+    "elo_ci": [elo_from_score(low), elo_from_score(high)],
+  }
+
+def git_commit():
+  try:
+    return subprocess.check_output(["git", "rev-parse", "HEAD"], stderr=subprocess.DEVNULL).decode().strip()
+  except (OSError, subprocess.CalledProcessError):
+    return None
+
+def run_benchmarks(games=20, seconds=1.0, number=2000):
+  return {
+    "commit": git_commit(),
+    "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    "python": platform.python_version(),
+    "numpy": np.__version__,
+    "micro_ns": micro_benchmarks(number),
+    "throughput": throughput_benchmarks(seconds),
+    "strength": {
+      "mcts1_vs_random": strength_benchmark(
+        {"type": "mcts", "max_time": None, "max_iterations": 200, "c": 1}, {"type": "random"}, games),
+      "minmax3_vs_mcts1": strength_benchmark(
+        {"type": "minmax", "max_time": None, "max_nodes": 2000, "heuristic": "attack"},
+        {"type": "mcts", "max_time": None, "max_iterations": 200, "c": 1}, games),
+    },
+  }
+
+def compare(old, new):
+  """
+  Prints new / old for every number in both result files. Times in
+  micro_ns are better when lower, everything else when higher.
+  """
+  for section in ("micro_ns", "throughput"):
+    for name, value in sorted(new[section].items()):
+      if name in old[section] and old[section][name]:
+        print("{:55} {:12.1f} {:12.1f} {:7.2f}x".format(section + "/" + name, old[section][name], value,
+          value / old[section][name]))
+  for name, value in sorted(new["strength"].items()):
+    if name in old["strength"]:
+      print("{:55} {:12.3f} {:12.3f}".format("strength/" + name, old["strength"][name]["score"], value["score"]))
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="Benchmark board operations, search throughput and strength.")
+  parser.add_argument("--out", default="benchmark_results.json", help="where to write the JSON results")
+  parser.add_argument("--games", type=int, default=20, help="games per strength pairing")
+  parser.add_argument("--seconds", type=float, default=1.0, help="search time per throughput measurement")
+  parser.add_argument("--compare", help="earlier results file to compare against")
+  args = parser.parse_args()
+
+  results = run_benchmarks(args.games, args.seconds)
+  with open(args.out, "w") as f:
+    json.dump(results, f, indent=2)
+  if args.compare:
+    with open(args.compare) as f:
+      compare(json.load(f), results)
@@ -1,17 +1,271 @@
 import numpy as np
+from symmetry import cell_maps
 
 # 0 -> incomplete
 # 1 -> X win
 # -1 -> O win
 # -2 -> draw
 
-class Board():
+# a 3x3 board is encoded in base 3, one digit per cell in row-major order:
+# 0 -> empty, 1 -> X, 2 -> O
+POW3 = [3 ** k for k in range(9)]
+TOKEN_DIGIT = {0: 0, 1: 1, -1: 2}
+
+def encode_local(board):
+    """
+    Returns the base 3 code of a 3x3 board of 0, 1 and -1 tokens. Draws
+    (-2) on a win_board are encoded as empty cells.
+    """
+    flat = np.asarray(board).ravel()
+    digits = np.where(flat == -1, 2, np.where(flat == 1, 1, 0))
+    return int(np.dot(digits, POW3))
+
+def _build_outcome_table():
+    """
+    Returns the outcome of every encoded 3x3 board, checking lines in the
+    same order as Board.compute_outcome.
+    """
+    codes = np.arange(3 ** 9)
+    digits = (codes[:, None] // np.array(POW3)) % 3
+    cells = np.where(digits == 2, -1, digits).reshape((-1, 3, 3))
+    line_sums = np.concatenate((
+        cells.sum(axis=1),
+        cells.sum(axis=2),
+        np.trace(cells, axis1=1, axis2=2)[:, None],
+        np.trace(cells[:, :, ::-1], axis1=1, axis2=2)[:, None],
+    ), axis=1)
+    complete = np.abs(line_sums) == 3
+    first_line = np.argmax(complete, axis=1)
+    winner = np.sign(line_sums[np.arange(codes.size), first_line])
+    table = np.where(np.all(digits != 0, axis=1), -2, 0)
+    table[np.any(complete, axis=1)] = winner[np.any(complete, axis=1)]
+    return table.astype(np.int8), digits
+
+def _build_completing_table(outcomes, digits):
+    """
+    Returns, for X and O, a bitmask per encoded board of the empty cells
+    that would complete a line for that player.
+    """
+    table = np.zeros((2, outcomes.size), dtype=np.int16)
+    codes = np.arange(outcomes.size)
+    for p_idx, player in enumerate((1, -1)):
+        for k in range(9):
+            empty = (digits[:, k] == 0) & (outcomes == 0)
+            new_codes = codes[empty] + TOKEN_DIGIT[player] * POW3[k]
+            wins = outcomes[new_codes] == player
+            table[p_idx, codes[empty][wins]] |= 1 << k
+    return table
+
+OUTCOME_TABLE, _digits = _build_outcome_table()
+COMPLETING_TABLE = _build_completing_table(OUTCOME_TABLE, _digits)
+del _digits
+# plain lists, indexing them is much faster than indexing the arrays
+_OUTCOMES = OUTCOME_TABLE.tolist()
+_COMPLETING = COMPLETING_TABLE.tolist()
+
+def lookup_outcome(code):
+    """
+    Returns the outcome (0, 1, -1 or -2) of an encoded 3x3 board.
+    """
+    return _OUTCOMES[code]
+
+def completing_cells(code, player):
+    """
+    Returns the (row, col) cells of an encoded 3x3 board on which player
+    would complete a line.
+    """
+    mask = _COMPLETING[0 if player == 1 else 1][code]
+    return [(k // 3, k % 3) for k in range(9) if mask >> k & 1]
+
+def _line_masks(dim):
+    """
+    Returns the bitmasks of every row, column and diagonal of a dim x dim
+    board whose cells are numbered row-major.
+    """
+    lines = []
+    for i in range(dim):
+        lines.append(sum(1 << (i * dim + j) for j in range(dim)))
+        lines.append(sum(1 << (j * dim + i) for j in range(dim)))
+    lines.append(sum(1 << (i * dim + i) for i in range(dim)))
+    lines.append(sum(1 << (i * dim + dim - 1 - i) for i in range(dim)))
+    return lines
+
+def _lines_through(dim):
+    """
+    Returns, for every cell of a dim x dim board, the line masks that
+    contain it.
+    """
+    lines = _line_masks(dim)
+    return [[line for line in lines if line >> cell & 1] for cell in range(dim * dim)]
+
+_BIT_TABLES = {}
+
+def _bit_tables(dim):
+    # line masks through each cell, the full mask and the 4-d move tuples,
+    # shared by every BitBoard of the same dim
+    if dim not in _BIT_TABLES:
+        n = dim * dim
+        moves = [[(g // dim, g % dim, c // dim, c % dim) for c in range(n)] for g in range(n)]
+        _BIT_TABLES[dim] = (_lines_through(dim), (1 << n) - 1, moves)
+    return _BIT_TABLES[dim]
+
+_ZOBRIST_TABLES = {}
+
+def _zobrist_tables(dim):
+    """
+    Returns the Zobrist keys of every (player, cell) pair, indexed
+    [player][g * dim * dim + c], and of every next_board value, the last
+    one standing for a free choice. The seed is fixed so keys are the same
+    in every process.
+    """
+    if dim not in _ZOBRIST_TABLES:
+        n = dim * dim
+        rng = np.random.default_rng(20211201 + dim)
+        keys = rng.integers(0, 2 ** 63, size=(2 * n * n + n + 1), dtype=np.int64).tolist()
+        pieces = {1: keys[:n * n], -1: keys[n * n:2 * n * n]}
+        _ZOBRIST_TABLES[dim] = (pieces, keys[2 * n * n:])
+    return _ZOBRIST_TABLES[dim]
+
+_SYMMETRY_TABLES = {}
+
+def _symmetry_tables(dim):
+    """
+    Returns the piece and next_board Zobrist tables of _zobrist_tables with
+    the keys of the 8 symmetric images packed into one int, 64 bits per
+    symmetry in the order of cell_maps, so one XOR per move keeps the keys
+    of all 8 images of a board up to date.
+    """
+    if dim not in _SYMMETRY_TABLES:
+        n = dim * dim
+        pieces, next_keys = _zobrist_tables(dim)
+        maps = cell_maps(dim)
+        sym_pieces = {}
+        for player in (1, -1):
+            sym_pieces[player] = [
+                sum(pieces[player][cells[g] * n + cells[c]] << (64 * s) for s, cells in enumerate(maps))
+                for g in range(n) for c in range(n)]
+        sym_next = [sum(next_keys[cells[k]] << (64 * s) for s, cells in enumerate(maps)) for k in range(n)]
+        sym_next.append(sum(next_keys[n] << (64 * s) for s in range(len(maps))))
+        _SYMMETRY_TABLES[dim] = (sym_pieces, sym_next)
+    return _SYMMETRY_TABLES[dim]
+
+def _next_index(next_board, dim):
+    # index of a next_board value into the Zobrist next_board keys
+    if next_board == (None, None):
+        return dim * dim
+    return next_board[0] * dim + next_board[1]
+
+class _LegalMoves():
+    """
+    Legal-move generation shared by Board and BitBoard, read from the
+    empty_cells bitmask of every local board and the open_boards bitmask
+    of undecided local boards that both keep up to date in move/undo_move.
+    Moves come out in the same row-major order as np.argwhere.
+
+    The move, line and Zobrist tables are shared by every board of the
+    same dim, so they are left out when a board is pickled.
+    """
+    _shared_tables = ("lines", "full", "moves", "piece_keys", "next_keys", "sym_piece_keys", "sym_next_keys")
+
+    def _load_tables(self):
+        self.lines, self.full, self.moves = _bit_tables(self.dim)
+        self.piece_keys, self.next_keys = _zobrist_tables(self.dim)
+        self.sym_piece_keys, self.sym_next_keys = _symmetry_tables(self.dim)
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        for name in self._shared_tables:
+            del state[name]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._load_tables()
+
+    def _playable_boards(self):
+        if self.next_board != (None, None):
+            g = self.next_board[0] * self.dim + self.next_board[1]
+            if self.open_boards >> g & 1:
+                return 1 << g
+        return self.open_boards
+
+    def availible_moves(self):
+        moves = []
+        playable = self._playable_boards()
+        while playable:
+            low = playable & -playable
+            g = low.bit_length() - 1
+            playable ^= low
+            empty = self.empty_cells[g]
+            local_moves = self.moves[g]
+            while empty:
+                low = empty & -empty
+                moves.append(local_moves[low.bit_length() - 1])
+                empty ^= low
+        return moves
+
+    def availible_moves_numpy(self):
+        return np.array(self.availible_moves(), dtype=np.int64).reshape(-1, 4)
+
+    def num_availible_moves(self):
+        count = 0
+        playable = self._playable_boards()
+        while playable:
+            low = playable & -playable
+            playable ^= low
+            count += bin(self.empty_cells[low.bit_length() - 1]).count("1")
+        return count
+
+    def nth_availible_move(self, n):
+        """
+        Returns availible_moves()[n] without building the list.
+        """
+        playable = self._playable_boards()
+        while playable:
+            low = playable & -playable
+            g = low.bit_length() - 1
+            playable ^= low
+            empty = self.empty_cells[g]
+            count = bin(empty).count("1")
+            if n >= count:
+                n -= count
+                continue
+            for _ in range(n):
+                empty &= empty - 1
+            return self.moves[g][(empty & -empty).bit_length() - 1]
+        raise IndexError("no legal move with index {}".format(n))
+
+class Board(_LegalMoves):
     def __init__(self, dim=3):
         self.dim = dim
         self.board = np.zeros((self.dim, self.dim, self.dim, self.dim), dtype=np.int8)
         self.win_board = np.zeros((self.dim, self.dim), dtype=np.int8)    
         self.result = 0
         self.next_board = (None, None)
+        # base 3 codes of the local boards and of the win_board (draws as
+        # empty), used to look outcomes up in OUTCOME_TABLE when dim == 3
+        self.local_codes = [0] * (self.dim * self.dim)
+        self.win_code = 0
+        self.decided = 0
+        # how many pieces of each player sit on every cell position, summed
+        # over the local boards, for the incremental heuristics
+        self.cell_counts = {1: [0] * (self.dim * self.dim), -1: [0] * (self.dim * self.dim)}
+        # bitmask of each player's pieces per local board and of the local
+        # boards each player won, to find wins with the line masks when
+        # dim != 3
+        self.piece_bits = {1: [0] * (self.dim * self.dim), -1: [0] * (self.dim * self.dim)}
+        self.x_wins = 0
+        self.o_wins = 0
+        self._load_tables()
+        # bitmask of empty cells per local board and of undecided local boards
+        self.empty_cells = [self.full] * (self.dim * self.dim)
+        self.open_boards = self.full
+        # Zobrist key of the pieces and next_board, kept up to date by move,
+        # and the keys of the 8 symmetric images packed together
+        self.key = self.next_keys[dim * dim]
+        self.sym_key = self.sym_next_keys[dim * dim]
+        # one entry per move with everything undo_move needs to restore
+        self.history = []
 
     def copy(self):
         new_board = Board(self.dim)
@@ -19,16 +273,48 @@ class Board():
         new_board.win_board = np.copy(self.win_board)
         new_board.result = self.result
         new_board.next_board = self.next_board
+        new_board.local_codes = self.local_codes[:]
+        new_board.win_code = self.win_code
+        new_board.decided = self.decided
+        new_board.cell_counts = {1: self.cell_counts[1][:], -1: self.cell_counts[-1][:]}
+        new_board.piece_bits = {1: self.piece_bits[1][:], -1: self.piece_bits[-1][:]}
+        new_board.x_wins = self.x_wins
+        new_board.o_wins = self.o_wins
+        new_board.empty_cells = self.empty_cells[:]
+        new_board.open_boards = self.open_boards
+        new_board.key = self.key
+        new_board.sym_key = self.sym_key
+        new_board.history = self.history[:]
         return new_board
 
+    def played_move(self, index):
+        """
+        Returns the (gi, gj, ci, cj) move of history[index].
+        """
+        return self.history[index][:4]
+
     def undo_move(self, move):
-        if move == None:
-            pass
-        else:
-            glob = (move[0], move[1])
-            self.board[move] = 0
-            self.win_board[glob] = 0
-            self.result = 0
+        """
+        Takes back the last move made on the board, restoring next_board,
+        the win_board cell and the result exactly from the move stack.
+        """
+        if move is None:
+            return
+        (globi, globj, loci, locj, player, self.next_board, local, code,
+            self.win_code, self.decided, self.open_boards, self.key, self.result) = self.history.pop()
+        self.board[globi, globj, loci, locj] = 0
+        self.win_board[globi, globj] = local
+        g = globi * self.dim + globj
+        c = loci * self.dim + locj
+        self.local_codes[g] = code
+        self.empty_cells[g] |= 1 << c
+        self.cell_counts[player][c] -= 1
+        self.piece_bits[player][g] ^= 1 << c
+        # local board g was open before the move
+        self.x_wins &= ~(1 << g)
+        self.o_wins &= ~(1 << g)
+        self.sym_key ^= (self.sym_piece_keys[player][g * self.dim * self.dim + c]
+            ^ self.sym_next_keys[_next_index(self.next_board, self.dim)] ^ self.sym_next_keys[c])
 
     def __str__(self, pretty_print=True) -> str:
         """
@@ -55,7 +341,7 @@ class Board():
             unfilled = "\n".join(self.dim * ([multiplier * sep, self.dim * (row + (self.dim-1) * row_clear)] + (self.dim-1) * [self.dim * (sep_clear + (self.dim-1) * clear), self.dim * (row + (self.dim-1) * row_clear)]))
             return unfilled.format(*list(flat_board))
         else:
-            stringify = np.vectorize(UltimateTTT.str_token, otypes=[np.ndarray])
+            stringify = np.vectorize(self._str_token, otypes=[np.ndarray])
             return str(stringify(self.board))
 
     @ staticmethod
@@ -70,14 +356,34 @@ class Board():
     def _mark_outcome(self, board_rep):
         for i in range(self.dim):
             for j in range(self.dim):
-                if self.win_board[i,j] == -2:
-                    board_rep[i,j,:,:] = np.array([["|","-"," "],["|", " ", "]"],["|","-"," "]])
-                elif self.win_board[i,j] == 1:
-                    board_rep[i,j,:,:] = np.array([["\\"," ","/"],[" ", "X", " "],["/"," ","\\"]])
-                elif self.win_board[i,j] == -1:
-                    board_rep[i,j,:,:] = np.array([["/","-","\\"],["|", " ", "|"],["\\","-","/"]])
+                if self.win_board[i,j] != 0:
+                    board_rep[i,j,:,:] = self._outcome_glyph(self.win_board[i,j])
         return board_rep
 
+    def _outcome_glyph(self, outcome):
+        """
+        Returns the dim x dim drawing that replaces a decided local board:
+        a cross for X, a ring for O and a bracket for a draw.
+        """
+        last = self.dim - 1
+        glyph = np.full((self.dim, self.dim), " ", dtype=object)
+        if outcome == 1:
+            for k in range(self.dim):
+                glyph[k, k] = "\\"
+                glyph[k, last - k] = "/"
+            if self.dim % 2 == 1:
+                glyph[last // 2, last // 2] = "X"
+        elif outcome == -1:
+            glyph[0, :] = glyph[last, :] = "-"
+            glyph[:, 0] = glyph[:, last] = "|"
+            glyph[0, 0] = glyph[last, last] = "/"
+            glyph[0, last] = glyph[last, 0] = "\\"
+        else:
+            glyph[0, 1:last] = glyph[last, 1:last] = "-"
+            glyph[1:last, last] = "]"
+            glyph[:, 0] = "|"
+        return glyph
+
     def _flatten_board(self, board):
         flat = np.zeros(0)
         for i in range(self.dim):
@@ -128,21 +434,85 @@ class Board():
         return -2 if np.all(board) else 0
 
     def move(self, move_array, player):
-        globi, globj, loci, locj = move_array[0], move_array[1], move_array[2], move_array[3]
-
-        self.board[globi, globj, loci, locj] = player
-
-        self.win_board[globi, globj] = self.compute_outcome(self.board[globi, globj, :, :])
+        globi, globj = int(move_array[0]), int(move_array[1])
+        loci, locj = int(move_array[2]), int(move_array[3])
 
-        alt_win_board = np.copy(self.win_board)
-        alt_win_board[self.win_board == -2] = 0
+        self.history.append((globi, globj, loci, locj, player, self.next_board,
+            int(self.win_board[globi, globj]), self.local_codes[globi * self.dim + globj],
+            self.win_code, self.decided, self.open_boards, self.key, self.result))
 
-        self.result = self.compute_outcome(alt_win_board)
+        self.board[globi, globj, loci, locj] = player
+        g = globi * self.dim + globj
+        c = loci * self.dim + locj
+        self.empty_cells[g] ^= 1 << c
+        self.cell_counts[player][c] += 1
+        self.piece_bits[player][g] |= 1 << c
+        old_next = _next_index(self.next_board, self.dim)
+        self.key ^= (self.piece_keys[player][g * self.dim * self.dim + c]
+            ^ self.next_keys[old_next] ^ self.next_keys[c])
+        self.sym_key ^= (self.sym_piece_keys[player][g * self.dim * self.dim + c]
+            ^ self.sym_next_keys[old_next] ^ self.sym_next_keys[c])
+
+        if self.dim == 3:
+            self._move_lookup(globi, globj, loci, locj, player)
+        else:
+            self._move_lines(g, c, player)
+        self.next_board = (loci, locj)
 
-        if self.result == 0 and np.all(self.win_board):
+    def _move_lines(self, g, c, player):
+        # same as _move_lookup for any dim, checking only the full length
+        # lines through the cell played and through its local board
+        pieces = self.piece_bits[player][g]
+        local = 0
+        for line in self.lines[c]:
+            if pieces & line == line:
+                local = player
+                break
+        else:
+            if self.empty_cells[g] == 0:
+                local = -2
+        if local == 0:
+            return
+
+        self.win_board[g // self.dim, g % self.dim] = local
+        self.open_boards ^= 1 << g
+        self.decided += 1
+        if local == -2:
+            wins = 0
+        elif local == 1:
+            self.x_wins |= 1 << g
+            wins = self.x_wins
+        else:
+            self.o_wins |= 1 << g
+            wins = self.o_wins
+        for line in self.lines[g]:
+            if wins & line == line:
+                self.result = local
+                return
+        if self.open_boards == 0:
             self.result = -2
 
-        self.next_board = (loci, locj)
+    def _move_lookup(self, globi, globj, loci, locj, player):
+        # same as the end of move, with both outcomes read from OUTCOME_TABLE
+        g = globi * 3 + globj
+        code = self.local_codes[g] + TOKEN_DIGIT[player] * POW3[loci * 3 + locj]
+        self.local_codes[g] = code
+
+        local = _OUTCOMES[code]
+        if local != 0:
+            self.win_board[globi, globj] = local
+            self.open_boards ^= 1 << g
+            self.decided += 1
+            if local == 1:
+                self.x_wins |= 1 << g
+            elif local == -1:
+                self.o_wins |= 1 << g
+            if local != -2:
+                self.win_code += TOKEN_DIGIT[local] * POW3[g]
+
+        self.result = _OUTCOMES[self.win_code]
+        if self.result == 0 and self.decided == 9:
+            self.result = -2
 
     def availible_moves_4d(self):
         # all open spots on the board, not caring if a given local board can be legally played on
@@ -166,6 +536,173 @@ class Board():
 
         return availible_moves
 
-    def availible_moves_numpy(self):
-        availible_4d = self.availible_moves_4d()
-        return np.argwhere(availible_4d == 1)
\ No newline at end of file
+class BitBoard(_LegalMoves):
+    """
+    Drop-in replacement for Board that stores each local board as one
+    bitmask per player and detects wins with precomputed line masks.
+    Moves are undone exactly from an internal move stack.
+    """
+    def __init__(self, dim=3):
+        self.dim = dim
+        self._load_tables()
+        n = dim * dim
+        # bitmask of X and O pieces for every local board
+        self.x_bits = [0] * n
+        self.o_bits = [0] * n
+        # outcome of every local board
+        self.local_results = [0] * n
+        self.empty_cells = [self.full] * n
+        # bitmasks of local boards won by X, won by O and still undecided
+        self.x_wins = 0
+        self.o_wins = 0
+        self.open_boards = self.full
+        # the same incremental summaries as Board keeps
+        self.win_code = 0
+        self.cell_counts = {1: [0] * n, -1: [0] * n}
+        self.result = 0
+        self.next_board = (None, None)
+        self.key = self.next_keys[n]
+        self.sym_key = self.sym_next_keys[n]
+        self.history = []
+
+    def copy(self):
+        new_board = BitBoard(self.dim)
+        new_board.x_bits = self.x_bits[:]
+        new_board.o_bits = self.o_bits[:]
+        new_board.local_results = self.local_results[:]
+        new_board.empty_cells = self.empty_cells[:]
+        new_board.x_wins = self.x_wins
+        new_board.o_wins = self.o_wins
+        new_board.open_boards = self.open_boards
+        new_board.win_code = self.win_code
+        new_board.cell_counts = {1: self.cell_counts[1][:], -1: self.cell_counts[-1][:]}
+        new_board.result = self.result
+        new_board.next_board = self.next_board
+        new_board.key = self.key
+        new_board.sym_key = self.sym_key
+        new_board.history = self.history[:]
+        return new_board
+
+    def move(self, move_array, player):
+        dim = self.dim
+        loci, locj = int(move_array[2]), int(move_array[3])
+        g = int(move_array[0]) * dim + int(move_array[1])
+        c = loci * dim + locj
+        bit = 1 << c
+
+        self.history.append((g, bit, player, self.next_board, self.key, self.result))
+        old_next = _next_index(self.next_board, dim)
+        self.key ^= (self.piece_keys[player][g * dim * dim + c]
+            ^ self.next_keys[old_next] ^ self.next_keys[c])
+        self.sym_key ^= (self.sym_piece_keys[player][g * dim * dim + c]
+            ^ self.sym_next_keys[old_next] ^ self.sym_next_keys[c])
+        self.next_board = (loci, locj)
+
+        if player == 1:
+            self.x_bits[g] |= bit
+            pieces = self.x_bits[g]
+        else:
+            self.o_bits[g] |= bit
+            pieces = self.o_bits[g]
+        self.empty_cells[g] ^= bit
+        self.cell_counts[player][c] += 1
+
+        local = 0
+        for line in self.lines[c]:
+            if pieces & line == line:
+                local = player
+                break
+        else:
+            if self.empty_cells[g] == 0:
+                local = -2
+        if local == 0:
+            return
+
+        self.local_results[g] = local
+        glob_bit = 1 << g
+        self.open_boards ^= glob_bit
+        if local == 1:
+            self.x_wins |= glob_bit
+            self.win_code += 3 ** g
+            wins = self.x_wins
+        elif local == -1:
+            self.o_wins |= glob_bit
+            self.win_code += 2 * 3 ** g
+            wins = self.o_wins
+        else:
+            wins = 0
+
+        for line in self.lines[g]:
+            if wins & line == line:
+                self.result = local
+                return
+        if self.open_boards == 0:
+            self.result = -2
+
+    def played_move(self, index):
+        """
+        Returns the (gi, gj, ci, cj) move of history[index].
+        """
+        g, bit = self.history[index][:2]
+        return self.moves[g][bit.bit_length() - 1]
+
+    def undo_move(self, move):
+        if move is None:
+            return
+        g, bit, player, self.next_board, self.key, self.result = self.history.pop()
+        local = self.local_results[g]
+        if local != 0:
+            glob_bit = 1 << g
+            self.local_results[g] = 0
+            self.open_boards |= glob_bit
+            self.x_wins &= ~glob_bit
+            self.o_wins &= ~glob_bit
+            if local != -2:
+                self.win_code -= TOKEN_DIGIT[local] * 3 ** g
+        if player == 1:
+            self.x_bits[g] ^= bit
+        else:
+            self.o_bits[g] ^= bit
+        self.empty_cells[g] |= bit
+        c = bit.bit_length() - 1
+        self.cell_counts[player][c] -= 1
+        self.sym_key ^= (self.sym_piece_keys[player][g * self.dim * self.dim + c]
+            ^ self.sym_next_keys[_next_index(self.next_board, self.dim)] ^ self.sym_next_keys[c])
+
+    def get_outcome(self):
+        return self.result
+
+    def get_state(self):
+        dim = self.dim
+        state = np.zeros((dim * dim, dim * dim), dtype=np.int8)
+        for g in range(dim * dim):
+            for c in range(dim * dim):
+                if self.x_bits[g] >> c & 1:
+                    state[g, c] = 1
+                elif self.o_bits[g] >> c & 1:
+                    state[g, c] = -1
+        return state.reshape((dim, dim, dim, dim))
+
+    def get_win_board(self):
+        return np.array(self.local_results, dtype=np.int8).reshape((self.dim, self.dim))
+
+    @property
+    def board(self):
+        return self.get_state()
+
+    @property
+    def win_board(self):
+        return self.get_win_board()
+
+    def to_board(self):
+        """
+        Returns an equivalent Board, built by replaying the moves made on
+        this one so all of its state is consistent.
+        """
+        board = Board(self.dim)
+        for index, entry in enumerate(self.history):
+            board.move(self.played_move(index), entry[2])
+        return board
+
+    def __str__(self) -> str:
+        return str(self.to_board())
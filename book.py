@@ -0,0 +1,78 @@
+from board import *
+from symmetry import canonical_key, inverse, transform_move
+
+# A book is a .npy file holding an open addressing hash table of
+# BOOK_DTYPE entries, a power of two in size, at most half full. An entry
+# stores the canonical key of a position and the best move found for it in
+# the canonical orientation, as g * 9 + c; key 0 marks an empty slot.
+BOOK_DTYPE = np.dtype([("key", "<u8"), ("move", "u1"), ("depth", "u1"), ("score", "<f4")])
+
+class OpeningBook(object):
+  """
+  Read-only opening book, memory-mapped from a file written by
+  write_book, so processes opening the same book share its pages.
+  """
+  def __init__(self, path):
+    self.path = path
+    self.table = np.load(path, mmap_mode="r")
+    self.mask = self.table.shape[0] - 1
+    self.hits = 0
+    self.misses = 0
+
+  def __getstate__(self):
+    # memory maps don't pickle, the book is mapped again where it is loaded
+    return {"path": self.path}
+
+  def __setstate__(self, state):
+    self.__init__(state["path"])
+
+  def probe(self, key):
+    """
+    Returns the table entry of a canonical key, or None.
+    """
+    slot = key & self.mask
+    while True:
+      entry = self.table[slot]
+      stored = int(entry["key"])
+      if stored == key:
+        return entry
+      if stored == 0:
+        return None
+      slot = (slot + 1) & self.mask
+
+  def lookup(self, board):
+    """
+    Returns the book move for board, or None if the position is not in
+    the book.
+    """
+    if board.dim != 3:
+      return None
+    key, s = canonical_key(board)
+    entry = self.probe(key)
+    if entry is None:
+      self.misses += 1
+      return None
+    move = int(entry["move"])
+    move = transform_move((move // 27, move // 9 % 3, move % 9 // 3, move % 3), inverse(3, s))
+    # keys could collide, so the move is checked to be legal
+    if move not in board.availible_moves():
+      self.misses += 1
+      return None
+    self.hits += 1
+    return move
+
+def write_book(path, entries):
+  """
+  Writes (canonical key, canonical move, depth, score) entries to a book
+  file at path.
+  """
+  size = 2
+  while size < 2 * len(entries):
+    size *= 2
+  table = np.zeros(size, dtype=BOOK_DTYPE)
+  for key, move, depth, score in entries:
+    slot = key & (size - 1)
+    while table[slot]["key"] != 0:
+      slot = (slot + 1) & (size - 1)
+    table[slot] = (key, (move[0] * 3 + move[1]) * 9 + move[2] * 3 + move[3], depth, score)
+  np.save(path, table)
@@ -0,0 +1,69 @@
+from board import *
+from book import write_book
+from symmetry import canonical_key, transform_move
+from tournament import make_agent
+import argparse
+import multiprocessing
+import os
+
+def book_positions(plies):
+  """
+  Returns one board per canonical position reachable in fewer than plies
+  moves from the empty board, with the player to move and the symmetry
+  to its canonical orientation.
+  """
+  positions = []
+  level = [(Board(3), 1)]
+  seen = set()
+  for _ in range(plies):
+    next_level = []
+    for board, player in level:
+      key, s = canonical_key(board)
+      if key in seen or board.result != 0:
+        continue
+      seen.add(key)
+      positions.append((board, player, key, s))
+      for move in board.availible_moves():
+        child = board.copy()
+        child.move(move, player)
+        next_level.append((child, -player))
+    level = next_level
+  return positions
+
+def search_position(job):
+  """
+  Searches one book position and returns its book entry.
+  """
+  board, player, key, s, spec = job
+  agent = make_agent(spec, player)
+  move = agent.make_move(board.copy())
+  info = agent.search_info
+  return key, transform_move(move, s), min(info["depth"], 255), info["score"] or 0.0
+
+def build_book(path, plies, spec, workers=None):
+  """
+  Searches every canonical position of the first plies moves with an
+  agent built from spec, on a pool of workers, and writes the book to
+  path. Returns the number of positions.
+  """
+  jobs = [position + (spec,) for position in book_positions(plies)]
+  pool = multiprocessing.Pool(workers)
+  try:
+    entries = pool.map(search_position, jobs)
+  finally:
+    pool.terminate()
+  write_book(path, entries)
+  return len(entries)
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="Build an opening book with deep minimax searches.")
+  parser.add_argument("--out", default="opening_book.npy", help="where to write the book")
+  parser.add_argument("--plies", type=int, default=3, help="plies covered by the book")
+  parser.add_argument("--seconds", type=float, default=5.0, help="search time per position")
+  parser.add_argument("--heuristic", default="attack", help="minimax heuristic")
+  parser.add_argument("--workers", type=int, default=os.cpu_count(), help="processes searching positions")
+  args = parser.parse_args()
+
+  spec = {"type": "minmax", "max_time": args.seconds, "heuristic": args.heuristic}
+  count = build_book(args.out, args.plies, spec, args.workers)
+  print("{} positions written to {}".format(count, args.out))
@@ -0,0 +1,96 @@
+import os
+import pickle
+from collections import OrderedDict
+
+class PositionCache(object):
+  """
+  Bounded map from position keys to values, evicting the least recently
+  used entry when full. Keys are Zobrist keys, or tuples of a label and a
+  Zobrist key when several kinds of values share one cache.
+  """
+  def __init__(self, max_size=2**16):
+    self.max_size = max_size
+    self.entries = OrderedDict()
+    self.reset_stats()
+
+  def reset_stats(self):
+    self.hits = 0
+    self.misses = 0
+    self.evictions = 0
+
+  def __len__(self):
+    return len(self.entries)
+
+  def get(self, key):
+    """
+    Returns the value stored for key, or None.
+    """
+    value = self.entries.get(key)
+    if value is None:
+      self.misses += 1
+      return None
+    try:
+      self.entries.move_to_end(key)
+    except KeyError:
+      # evicted by a search pondering in another thread
+      pass
+    self.hits += 1
+    return value
+
+  def put(self, key, value):
+    self.entries[key] = value
+    self.entries.move_to_end(key)
+    if len(self.entries) > self.max_size:
+      self.entries.popitem(last=False)
+      self.evictions += 1
+
+  def clear(self):
+    self.entries.clear()
+
+  def hit_rate(self):
+    lookups = self.hits + self.misses
+    return self.hits / lookups if lookups else 0.0
+
+  def stats(self):
+    return {
+      "size": len(self.entries),
+      "max_size": self.max_size,
+      "hits": self.hits,
+      "misses": self.misses,
+      "hit_rate": self.hit_rate(),
+      "evictions": self.evictions,
+    }
+
+  def merge(self, other):
+    """
+    Adds the entries of another cache. Of playout statistics found in
+    both, the ones with more playouts are kept: caches loaded from the same
+    file share their older playouts, so summing would count them twice.
+    """
+    for key, value in other.entries.items():
+      mine = self.entries.get(key)
+      if mine is None or (isinstance(mine, list) and value[0] > mine[0]):
+        self.put(key, value)
+
+  def save(self, path):
+    """
+    Writes the entries to path, replacing it only once they are written.
+    """
+    tmp_path = "{}.{}.tmp".format(path, os.getpid())
+    with open(tmp_path, "wb") as f:
+      pickle.dump((self.max_size, list(self.entries.items())), f, pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)
+
+def load_cache(path, max_size=2**16):
+  """
+  Returns the cache saved at path, or an empty one if there is none,
+  bounded by max_size.
+  """
+  cache = PositionCache(max_size)
+  if os.path.exists(path):
+    with open(path, "rb") as f:
+      _, entries = pickle.load(f)
+    for key, value in entries:
+      cache.put(key, value)
+    cache.evictions = 0
+  return cache
@@ -1,22 +1,35 @@
 from board import *
 from agents import *
 from heuristics import *
+from playout import batch_random_games
+from tournament import pairing, print_tournament
+from records import GameRecorder, append_record
+import os
 
-def score_AIs(num_games, player_algo, opponent_algo):
+def score_AIs(num_games, player_algo, opponent_algo, board_class=Board, record_path=None):
   # 0 -> win
   # 1 -> loss
   # 2 -> tie
+  # every game is appended to record_path as a game record, if not None
   score = np.zeros(3)
   p_player = player_algo.get_player()
 
   ais = {p_player:player_algo, opponent_algo.get_player():opponent_algo}
 
   for _ in range(num_games):
-    board = Board(3)
+    board = board_class(3)
+    game_seed = None
+    if record_path is not None:
+      # reseeding lets the record replay agents using the global stream
+      game_seed = np.random.randint(2**31)
+      np.random.seed(game_seed)
+    recorder = GameRecorder(ais, board.dim, game_seed=game_seed)
     player = 1
     while board.get_outcome() == 0:
-      ais[player].make_move(board)
+      recorder.make_move(ais[player], board)
       player = -player
+    if record_path is not None:
+      append_record(record_path, recorder.record(board.get_outcome()))
     if board.get_outcome() == -2:
       score[2] += 1
     elif board.get_outcome() == p_player:
@@ -29,9 +42,14 @@ def score_AIs(num_games, player_algo, opponent_algo):
     
   return score
 
-def print_out_result(player_agent, opponent_agent, num_games, label):
+def score_random_games(num_games):
+  # random X vs random O, all games played at once
+  results = batch_random_games(num_games)
+  return np.array([np.sum(results == 1), np.sum(results == -1), np.sum(results == -2)], dtype=float)
+
+def print_out_result(player_agent, opponent_agent, num_games, label, board_class=Board, record_path=None):
   time_s = time.time()
-  game = score_AIs(num_games, player_agent, opponent_agent)
+  game = score_AIs(num_games, player_agent, opponent_agent, board_class, record_path)
   time_e = time.time()
   print(label)
   print(game)
@@ -39,44 +57,49 @@ def print_out_result(player_agent, opponent_agent, num_games, label):
 
 if __name__ == "__main__":
   num_games = 500
-  
+  # games run in parallel on all cores, and a rerun resumes from the results
+  # already in results_path
+  workers = os.cpu_count()
+  results_path = "tournament_results.jsonl"
+  # agents whose spec has "cache": True share heuristic values and playout
+  # results, kept warm between runs in cache_path; None to start cold
+  cache_path = None
+  # every game played is appended there as a game record, see records.py;
+  # None to keep only the results
+  record_path = "game_records.bin"
+
   max_time_mcts = .2
   max_time_minmax = .1
 
-  randX = RandomAgent(1)
-  randO = RandomAgent(-1)
-
-  mcts1X = TimedMCTSAgent(1, max_time_mcts, 1)
-  mcts1O = TimedMCTSAgent(-1, max_time_mcts, 1)
-  mcts10X = TimedMCTSAgent(1, max_time_mcts, 10)
-  mcts10O = TimedMCTSAgent(-1, max_time_mcts, 10)
-  mcts100X = TimedMCTSAgent(1, max_time_mcts, 100)
-  mcts100O = TimedMCTSAgent(-1, max_time_mcts, 100)
-
-  minmax1X = TimedMinmaxAgent(1, max_time_minmax, end_value, plus_heuristic_fun(local_h, global_h, 1))
-  minmax1O = TimedMinmaxAgent(-1, max_time_minmax, end_value, plus_heuristic_fun(local_h, global_h, -1))
-  minmax2X = TimedMinmaxAgent(1, max_time_minmax, end_value, plus_neg_heuristic_fun(local_h, global_h, 1))
-  minmax2O = TimedMinmaxAgent(-1, max_time_minmax, end_value, plus_neg_heuristic_fun(local_h, global_h, -1))
-  minmax3X = TimedMinmaxAgent(1, max_time_minmax, end_value, attack_heuristic_fun(local_h, attack_h, 1))
-  minmax3O = TimedMinmaxAgent(-1, max_time_minmax, end_value, attack_heuristic_fun(local_h, attack_h, -1))
-
-  AIsX = [mcts1X, mcts10X, mcts100X, minmax1X, minmax2X, minmax3X]
-  AIsX_labels = ["mcts1X", "mcts10X", "mcts100X", "minmax1X", "minmax2X", "minmax3X"]
+  rand = {"type": "random"}
+  AIs = [
+    {"type": "mcts", "max_time": max_time_mcts, "c": 1},
+    {"type": "mcts", "max_time": max_time_mcts, "c": 10},
+    {"type": "mcts", "max_time": max_time_mcts, "c": 100},
+    {"type": "minmax", "max_time": max_time_minmax, "heuristic": "plus"},
+    {"type": "minmax", "max_time": max_time_minmax, "heuristic": "plus_neg"},
+    {"type": "minmax", "max_time": max_time_minmax, "heuristic": "attack"},
+  ]
+  AIs_labels = ["mcts1", "mcts10", "mcts100", "minmax1", "minmax2", "minmax3"]
 
-  AIsO = [mcts1O, mcts10O, mcts100O, minmax1O, minmax2O, minmax3O]
-  AIsO_labels = ["mcts1O", "mcts10O", "mcts100O", "minmax1O", "minmax2O", "minmax3O"]
-
-  print_out_result(randX, randO, num_games, "random X vs random O")
+  time_s = time.time()
+  game = score_random_games(num_games)
+  print("random X vs random O")
+  print(game)
+  print(time.time() - time_s)
 
+  pairings = []
   # O random
-  for i in range(len(AIsX)):
-    print_out_result(AIsX[i], randO, num_games, AIsX_labels[i] + " vs random O")
+  for i in range(len(AIs)):
+    pairings.append(pairing(AIs_labels[i] + "X vs random O", AIs[i], 1, rand))
 
   # X random
-  for i in range(len(AIsO)):
-    print_out_result(AIsO[i], randX, num_games, AIsO_labels[i] + " vs random X")
+  for i in range(len(AIs)):
+    pairings.append(pairing(AIs_labels[i] + "O vs random X", AIs[i], -1, rand))
 
   # combos
-  for i in range(len(AIsX)):
-    for j in range(len(AIsO)):
-      print_out_result(AIsX[i], AIsO[j], num_games, AIsX_labels[i] + " vs " + AIsO_labels[j])
+  for i in range(len(AIs)):
+    for j in range(len(AIs)):
+      pairings.append(pairing(AIs_labels[i] + "X vs " + AIs_labels[j] + "O", AIs[i], 1, AIs[j]))
+
+  print_tournament(pairings, num_games, workers, results_path, cache_path, record_path)
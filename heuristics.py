@@ -1,78 +1,211 @@
+import json
 import numpy as np
+from operator import mul
+from board import POW3, OUTCOME_TABLE, _line_masks, _lines_through
 
 def end_value(outcome):
   if outcome == -2:
     return 0
   return 100000 * outcome
 
+# tokens (0, 1, -1) of the global board for every win_code, drawn local
+# boards counting as empty
+_WIN_TOKENS = (np.arange(3 ** 9)[:, None] // np.array(POW3)) % 3
+_WIN_TOKENS = np.where(_WIN_TOKENS == 2, -1, _WIN_TOKENS)
+
+def _line_cells(dim):
+  # cells of the rows, columns and diagonals of a dim x dim board
+  return [[k for k in range(dim * dim) if line >> k & 1] for line in _line_masks(dim)]
+
+_LINES = _line_cells(3)
+
+# The evaluators below score a board from what Board.move and undo_move
+# keep up to date: cell_counts for the local boards, and for the global
+# board win_code on dim 3 and the x_wins and o_wins bitmasks otherwise.
+# On dim 3 everything that depends on the global board is looked up in
+# tables built for the heuristic's weights.
+
+def _cell_weights(local_heuristic):
+  return [float(w) for w in np.ravel(local_heuristic)]
+
+def _dim(local_heuristic):
+  return np.shape(local_heuristic)[0]
+
+def _threat_weights(attack_heuristic, dim):
+  # weight of a line holding |s| more wins of one player than of the
+  # other, for |s| from 0 to dim: full lines have ended the game
+  weights = [0.0] * (dim + 1)
+  for k in range(1, min(dim, len(attack_heuristic) + 1)):
+    weights[k] = float(attack_heuristic[k - 1])
+  return weights
+
+def _attack_table(attack_heuristic):
+  # line threat term of every win_code
+  sums = _WIN_TOKENS[:, _LINES].sum(axis=2)
+  terms = np.array(_threat_weights(attack_heuristic, 3))[np.abs(sums)] * sums
+  return terms.sum(axis=1).astype(float).tolist()
+
+def _mask_sum(weights, mask):
+  # sum of the weights of the cells set in mask
+  total = 0
+  while mask:
+    low = mask & -mask
+    total += weights[low.bit_length() - 1]
+    mask ^= low
+  return total
+
 def plus_heuristic_fun(local_heuristic, global_heuristic, player):
-  heuristic_state = np.zeros((3,3,3,3))
-  for i in range(3):
-    for j in range(3):
-      heuristic_state[i,j,:,:] = local_heuristic
+  weights = _cell_weights(local_heuristic)
+  if _dim(local_heuristic) != 3:
+    global_weights = _cell_weights(global_heuristic)
+    def fun(board):
+      lost = board.o_wins if player == 1 else board.x_wins
+      return player * sum(map(mul, weights, board.cell_counts[player])) - player * _mask_sum(global_weights, lost)
+    return fun
+  # local boards won by the opponent count against player
+  wins = ((_WIN_TOKENS == -player) @ np.ravel(global_heuristic) * -player).astype(float).tolist()
   def fun(board):
-    state = board.get_state()
-    state[state == -player] = 0
-    win_board = board.get_win_board()
-    win_board[np.logical_or(win_board == player, win_board == -2)] = 0
-    return np.sum(heuristic_state * state) + np.sum(global_heuristic * win_board)
+    return player * sum(map(mul, weights, board.cell_counts[player])) + wins[board.win_code]
   return fun
 
 def plus_neg_heuristic_fun(local_heuristic, global_heuristic, player):
-  heuristic_state = np.zeros((3,3,3,3))
-  for i in range(3):
-    for j in range(3):
-      heuristic_state[i,j,:,:] = local_heuristic
+  weights = _cell_weights(local_heuristic)
+  if _dim(local_heuristic) != 3:
+    global_weights = _cell_weights(global_heuristic)
+    def fun(board):
+      counts = board.cell_counts
+      return (sum(map(mul, weights, counts[1])) - sum(map(mul, weights, counts[-1]))
+        + _mask_sum(global_weights, board.x_wins) - _mask_sum(global_weights, board.o_wins))
+    return fun
+  # drawn local boards count 0: the .5 * player they used to be given was
+  # truncated by the int8 win_board
+  wins = (_WIN_TOKENS @ np.ravel(global_heuristic)).astype(float).tolist()
   def fun(board):
-    state = board.get_state()
-    win_board = board.get_win_board()
-    win_board[win_board == -2] = .5 * player
-    return np.sum(heuristic_state * state) + np.sum(global_heuristic * win_board)
+    counts = board.cell_counts
+    return (sum(map(mul, weights, counts[1])) - sum(map(mul, weights, counts[-1]))
+      + wins[board.win_code])
   return fun
 
 def attack_heuristic_fun(local_heuristic, attack_heuristic, player):
-  heuristic_state = np.zeros((3,3,3,3))
-  for i in range(3):
-    for j in range(3):
-      heuristic_state[i,j,:,:] = local_heuristic
+  weights = _cell_weights(local_heuristic)
+  dim = _dim(local_heuristic)
+  if dim != 3:
+    lines = _line_masks(dim)
+    threat_weights = _threat_weights(attack_heuristic, dim)
+    def fun(board):
+      counts = board.cell_counts
+      total = sum(map(mul, weights, counts[1])) - sum(map(mul, weights, counts[-1]))
+      x_wins, o_wins = board.x_wins, board.o_wins
+      for line in lines:
+        s = bin(x_wins & line).count("1") - bin(o_wins & line).count("1")
+        if s:
+          total += threat_weights[abs(s)] * s
+      return total
+    return fun
+  threats = _attack_table(attack_heuristic)
   def fun(board):
-    state = board.get_state()
-    win_board = board.get_win_board()
-
-    win_board[win_board == -2] = 0
+    counts = board.cell_counts
+    return (sum(map(mul, weights, counts[1])) - sum(map(mul, weights, counts[-1]))
+      + threats[board.win_code])
+  return fun
 
-    row_array = np.sum(win_board, axis=0)
-    col_array = np.sum(win_board, axis=1)
-    diag_lr = np.trace(win_board)
-    diag_rl = np.trace(np.rot90(win_board))
+def cached_heuristic_fun(heuristic, cache, label):
+  """
+  Returns heuristic with its values kept in a PositionCache under
+  (label, board key); label tells apart heuristics sharing the cache.
+  """
+  def fun(board):
+    key = (label, board.key)
+    value = cache.get(key)
+    if value is None:
+      value = heuristic(board)
+      cache.put(key, value)
+    return value
+  return fun
 
-    sum = 0
+# The batch versions score N positions in one pass, from stacked
+# (N, dim, dim, dim, dim) states and (N, dim, dim) win boards, each score equal to what
+# the evaluator above gives the same position.
 
-    for i in range(row_array.shape[0]):
-      if np.abs(row_array[i]) == 1:
-        sum += attack_heuristic[0] * row_array[i]
-      elif np.abs(row_array[i]) == 2:
-        sum += attack_heuristic[1] * row_array[i]
+def plus_heuristic_batch_fun(local_heuristic, global_heuristic, player):
+  local_weights = np.asarray(local_heuristic, dtype=float)
+  global_weights = np.asarray(global_heuristic, dtype=float)
+  def fun(states, win_boards):
+    own = np.where(states == player, player, 0)
+    lost = np.where(win_boards == -player, -player, 0)
+    return (own * local_weights).sum(axis=(1, 2, 3, 4)) + (lost * global_weights).sum(axis=(1, 2))
+  return fun
 
-    for i in range(col_array.shape[0]):
-      if np.abs(col_array[i]) == 1:
-        sum += attack_heuristic[0] * col_array[i]
-      elif np.abs(col_array[i]) == 2:
-        sum += attack_heuristic[1] * col_array[i]
+def plus_neg_heuristic_batch_fun(local_heuristic, global_heuristic, player):
+  local_weights = np.asarray(local_heuristic, dtype=float)
+  global_weights = np.asarray(global_heuristic, dtype=float)
+  def fun(states, win_boards):
+    wins = np.where(win_boards == -2, 0, win_boards)
+    return (states * local_weights).sum(axis=(1, 2, 3, 4)) + (wins * global_weights).sum(axis=(1, 2))
+  return fun
 
-    if np.abs(diag_lr) == 1:
-      sum += attack_heuristic[0] * diag_lr
-    elif np.abs(diag_lr) == 2:
-      sum += attack_heuristic[1] * diag_lr
+def attack_heuristic_batch_fun(local_heuristic, attack_heuristic, player):
+  local_weights = np.asarray(local_heuristic, dtype=float)
+  dim = _dim(local_heuristic)
+  lines = _line_cells(dim)
+  threat_weights = np.array(_threat_weights(attack_heuristic, dim))
+  def fun(states, win_boards):
+    wins = np.where(win_boards == -2, 0, win_boards).reshape((-1, dim * dim))
+    sums = wins[:, lines].sum(axis=2)
+    threats = threat_weights[np.abs(sums)] * sums
+    return (states * local_weights).sum(axis=(1, 2, 3, 4)) + threats.sum(axis=1)
+  return fun
 
-    if np.abs(diag_rl) == 1:
-      sum += attack_heuristic[0] * diag_rl
-    elif np.abs(diag_rl) == 2:
-      sum += attack_heuristic[1] * diag_rl
+def stack_positions(boards):
+  """
+  Returns the stacked states and win boards of a list of boards.
+  """
+  states = np.stack([board.get_state() for board in boards])
+  win_boards = np.stack([board.get_win_board() for board in boards])
+  return states, win_boards
 
-    return np.sum(heuristic_state * state) + sum
-  return fun
+def child_positions(board, player):
+  """
+  Returns the legal moves of player on a dim 3 board with the stacked
+  states and win boards of the positions they lead to, without making
+  them on board.
+  """
+  moves = board.availible_moves_numpy()
+  rows = np.arange(moves.shape[0])
+  gi, gj, ci, cj = moves.T
+  states = np.repeat(board.get_state()[None], moves.shape[0], axis=0)
+  states[rows, gi, gj, ci, cj] = player
+  win_boards = np.repeat(board.get_win_board()[None], moves.shape[0], axis=0)
+  # outcome of the local board each move was made on
+  local = states[rows, gi, gj].reshape((-1, 9))
+  codes = np.where(local == -1, 2, local).astype(np.int64) @ np.array(POW3)
+  win_boards[rows, gi, gj] = OUTCOME_TABLE[codes]
+  return moves, states, win_boards
 
 local_h = np.array([[2,1,2],[1,3,1],[2,1,2]])
 global_h = np.array([[8,6,8],[6,10,6],[8,6,8]])
-attack_h = np.array([4,5])
\ No newline at end of file
+attack_h = np.array([4,5])
+def default_weights(dim=3):
+  """
+  Returns hand-picked weights for a dim x dim board, keyed like
+  load_weights: cells on more lines are worth more, and threats more the
+  closer they are to a full line. For dim 3 these are local_h, global_h
+  and attack_h.
+  """
+  lines = [len(through) for through in _lines_through(dim)]
+  counts = np.array(lines).reshape((dim, dim))
+  return {"local_h": counts - 1, "global_h": 2 * (counts + 1), "attack_h": 4 + np.arange(dim - 1)}
+
+def load_weights(path):
+  """
+  Returns the weights in a file written by tuning.py, as arrays keyed
+  like local_h, global_h and attack_h, with the hand-picked ones filling
+  in what the file doesn't have.
+  """
+  with open(path) as f:
+    stored = json.load(f)
+  weights = {"local_h": local_h, "global_h": global_h, "attack_h": attack_h}
+  for name in weights:
+    if name in stored:
+      weights[name] = np.array(stored[name])
+  return weights
@@ -0,0 +1,160 @@
+import cProfile
+import io
+import json
+import pstats
+import time
+
+# board methods timed as move generation and as making/unmaking moves;
+# _move_lookup and _move_lines are the outcome checks of Board.move
+_MOVEGEN = ("availible_moves", "num_availible_moves", "nth_availible_move")
+_MAKE_UNMAKE = ("move", "undo_move")
+
+class Instrumentation(object):
+  """
+  Per-move counters and timers for a search agent.
+
+  instrument() shadows the agent's make_move with a version that, for the
+  duration of one move, wraps the hot methods of the agent, its board and
+  its MCTS tree with counting and timing wrappers, then removes them
+  again. An agent that is not instrumented runs its own unwrapped code, so
+  instrumentation costs nothing while disabled.
+  """
+  def __init__(self, log_path=None, logger=None):
+    self.log_path = log_path
+    self.logger = logger
+    self.records = []
+    self.counters = None
+    self._wrapped = []
+
+  def _wrap(self, obj, name, key, depth_arg=None, depth_result=False, timed=True):
+    # replaces obj.name by a wrapper adding its time to key and counting
+    # calls, restored by _unwrap. The search depth is read from argument
+    # depth_arg or from the second item of the result
+    fun = getattr(obj, name)
+    counters = self.counters
+    counters.setdefault(key + "_calls", 0)
+    if timed:
+      counters.setdefault(key + "_time", 0.0)
+
+    def wrapper(*args, **kwargs):
+      if depth_arg is not None and args[depth_arg] > counters["max_depth"]:
+        counters["max_depth"] = args[depth_arg]
+      counters[key + "_calls"] += 1
+      if not timed:
+        return fun(*args, **kwargs)
+      t = time.perf_counter()
+      try:
+        result = fun(*args, **kwargs)
+      finally:
+        counters[key + "_time"] += time.perf_counter() - t
+      if depth_result and result[1] > counters["max_depth"]:
+        counters["max_depth"] = result[1]
+      return result
+
+    self._wrapped.append((obj, name, obj.__dict__.get(name)))
+    setattr(obj, name, wrapper)
+
+  def _unwrap(self):
+    for obj, name, original in reversed(self._wrapped):
+      if original is None:
+        del obj.__dict__[name]
+      else:
+        setattr(obj, name, original)
+    self._wrapped = []
+
+  def _wrap_board(self, board):
+    for name in _MOVEGEN:
+      self._wrap(board, name, "movegen")
+    for name in _MAKE_UNMAKE:
+      self._wrap(board, name, "make_unmake")
+    for name in ("_move_lookup", "_move_lines"):
+      if hasattr(board, name):
+        self._wrap(board, name, "outcome")
+
+  def _wrap_tree(self, tree):
+    self._wrap(tree, "select", "select", depth_result=True)
+    self._wrap(tree, "expand", "expand")
+    self._wrap_board(tree.board)
+
+  def make_move(self, agent, make_move, board):
+    """
+    Runs make_move(board) for agent with its hot paths wrapped and records
+    the counters of the move.
+    """
+    self.counters = {"max_depth": 0}
+    time_s = time.perf_counter()
+    if hasattr(agent, "heuristic"):
+      # minimax: searches the board it is given
+      self._wrap(agent, "heuristic", "eval")
+      self._wrap(agent, "record_cutoff", "cutoff", timed=False)
+      # recursive, so their times would nest
+      self._wrap(agent, "maximize", "maximize", depth_arg=4, timed=False)
+      self._wrap(agent, "minimize", "minimize", depth_arg=4, timed=False)
+      self._wrap_board(board)
+    elif hasattr(agent, "new_tree"):
+      # MCTS: searches on the working board of its tree
+      if agent.tree is not None:
+        self._wrap_tree(agent.tree)
+      new_tree = agent.new_tree
+      def wrapped_new_tree(board):
+        tree = new_tree(board)
+        self._wrap_tree(tree)
+        return tree
+      self._wrapped.append((agent, "new_tree", agent.__dict__.get("new_tree")))
+      agent.new_tree = wrapped_new_tree
+    try:
+      move = make_move(board)
+    finally:
+      self._unwrap()
+
+    record = {
+      "agent": type(agent).__name__,
+      "player": agent.get_player(),
+      "ply": len(board.history),
+      "move": [int(x) for x in move],
+      "time": time.perf_counter() - time_s,
+    }
+    record.update(self.counters)
+    record.update(getattr(agent, "search_info", {}))
+    if getattr(agent, "tree", None) is not None:
+      record["tree_nodes"] = agent.tree.size
+    if getattr(agent, "tt", None) is not None:
+      record["tt_hits"] = agent.tt.hits
+    self.emit(record)
+    return move
+
+  def emit(self, record):
+    self.records.append(record)
+    line = json.dumps(record, default=str)
+    if self.log_path is not None:
+      with open(self.log_path, "a") as f:
+        f.write(line + "\n")
+    if self.logger is not None:
+      self.logger.info(line)
+
+def instrument(agent, log_path=None, logger=None):
+  """
+  Turns instrumentation on for agent and returns the Instrumentation
+  collecting its per-move records, which are also appended as JSON lines
+  to log_path and sent to logger when given.
+  """
+  instrumentation = Instrumentation(log_path, logger)
+  make_move = type(agent).make_move.__get__(agent)
+  agent.make_move = lambda board: instrumentation.make_move(agent, make_move, board)
+  agent.instrumentation = instrumentation
+  return instrumentation
+
+def uninstrument(agent):
+  agent.__dict__.pop("make_move", None)
+  agent.__dict__.pop("instrumentation", None)
+
+def profile_move(agent, board, sort="cumulative", limit=25):
+  """
+  Makes one move for agent under cProfile and returns the move and the
+  profile report.
+  """
+  profile = cProfile.Profile()
+  move = profile.runcall(agent.make_move, board)
+  out = io.StringIO()
+  pstats.Stats(profile, stream=out).sort_stats(sort).print_stats(limit)
+  return move, out.getvalue()
@@ -1,6 +1,7 @@
 from board import *
 from agents import *
 from heuristics import *
+from records import GameRecorder, append_record
 import re
 
 def main():
@@ -33,17 +34,17 @@ def select_AI():
   if p_input == "1":
     AI_vs_player(RandomAgent(1))
   elif p_input == "2":
-    AI_vs_player(TimedMCTSAgent(1, .2, 1))
+    AI_vs_player(TimedMCTSAgent(1, .2, 1, ponder=True))
   elif p_input == "3":
-    AI_vs_player(TimedMCTSAgent(1, .2, 10))
+    AI_vs_player(TimedMCTSAgent(1, .2, 10, ponder=True))
   elif p_input == "4":
-    AI_vs_player(TimedMCTSAgent(1, .2, 100))
+    AI_vs_player(TimedMCTSAgent(1, .2, 100, ponder=True))
   elif p_input == "5":
-    AI_vs_player(TimedMinmaxAgent(1, .1, end_value, plus_heuristic_fun(local_h, global_h, 1)))
+    AI_vs_player(TimedMinmaxAgent(1, .1, end_value, plus_heuristic_fun(local_h, global_h, 1), ponder=True))
   elif p_input == "6":
-    AI_vs_player(TimedMinmaxAgent(1, .1, end_value, plus_neg_heuristic_fun(local_h, global_h, 1)))
+    AI_vs_player(TimedMinmaxAgent(1, .1, end_value, plus_neg_heuristic_fun(local_h, global_h, 1), ponder=True))
   elif p_input == "7":
-    AI_vs_player(TimedMinmaxAgent(1, .1, end_value, attack_heuristic_fun(local_h, attack_h, 1)))
+    AI_vs_player(TimedMinmaxAgent(1, .1, end_value, attack_heuristic_fun(local_h, attack_h, 1), ponder=True))
   else:
     print("wrong input")
     select_AI_X()
@@ -98,19 +99,27 @@ def select_AI_O(ai_p):
     select_AI_O(ai_p)
 
 
+# games watched are appended there as game records, see records.py; None
+# to keep none
+RECORD_PATH = "game_records.bin"
+
 def AI_vs_AI(ai_p, ai_o):
   p_player = ai_p.get_player()
 
   ais = {p_player:ai_p, ai_o.get_player():ai_o}
 
   board = Board(3)
+  recorder = GameRecorder(ais, board.dim)
   player = 1
   while board.get_outcome() == 0:
-    move = ais[player].make_move(board)
+    move = recorder.make_move(ais[player], board)
     player = -player
     print(move)
     print(board)
     time.sleep(1)
+  close_agents(ai_p, ai_o)
+  if RECORD_PATH is not None:
+    append_record(RECORD_PATH, recorder.record(board.get_outcome()))
 
   if board.get_outcome == 1:
     print("X won")
@@ -121,6 +130,12 @@ def AI_vs_AI(ai_p, ai_o):
 
   main()
 
+def close_agents(*ais):
+  # stops agents that ponder on the opponent's time
+  for ai in ais:
+    if hasattr(ai, "close"):
+      ai.close()
+
 def parse_input(str):
     parsed = re.findall("[0-9]+", str)
     return np.array([int(parsed[0]), int(parsed[1]), int(parsed[2]), int(parsed[3])])
@@ -157,6 +172,7 @@ def AI_vs_player(ai_o):
       print(move)
       print(board)
       player = -player
+  close_agents(ai_o)
 
   if board.get_outcome == p_player:
     print("you won")
@@ -0,0 +1,427 @@
+import math
+import time
+import numpy as np
+from playout import batch_random_playouts
+from symmetry import canonical_key, piece_symmetries
+
+def random_playout(board, player, rng=np.random):
+  """
+  Plays random moves from board, player having made the last move, to
+  the end of the game, takes them back and returns the result.
+  """
+  played = 0
+  while board.result == 0:
+    player = -player
+    choice = rng.randint(board.num_availible_moves())
+    board.move(board.nth_availible_move(choice), player)
+    played += 1
+  result = board.result
+
+  for _ in range(played):
+    board.undo_move(board.history[-1])
+  return result
+
+def _playout_task(args):
+  # runs in a worker process of a leaf-parallel search
+  board, player, seed = args
+  return random_playout(board, player, np.random.RandomState(seed))
+
+def root_search_task(args):
+  # one worker of a root-parallel search, returns root_stats() of its tree
+  board, player, c, max_time, max_iterations, max_nodes, playouts_per_leaf, seed, symmetric = args
+  tree = MCTSTree(board, player, c, max_nodes, playouts_per_leaf, np.random.RandomState(seed), symmetric)
+  tree.search(max_time, max_iterations)
+  return tree.root_stats()
+
+def merge_root_stats(results):
+  """
+  Sums the root child statistics of several trees searched from the same
+  position. Returns a dict from move to [visits, wins, ties], in the
+  order the moves were first seen.
+  """
+  merged = {}
+  for moves, visits, wins, ties in results:
+    for move, v, w, t in zip(moves, visits, wins, ties):
+      stats = merged.setdefault(move, [0, 0, 0])
+      stats[0] += v
+      stats[1] += w
+      stats[2] += t
+  return merged
+
+class MCTSTree(object):
+  """
+  Monte Carlo search tree stored in parallel arrays indexed by node id.
+
+  The children of a node are stored next to each other, starting at
+  first_child[node]. Nodes don't keep boards: the position of a node is
+  rebuilt by replaying the moves from the root on one working board, and
+  taken back after each iteration. When max_nodes is set and the tree
+  fills up, the children of rarely visited nodes are pruned. When
+  symmetric is set, moves that lead to equivalent positions share one
+  child. With a cache, playout results are shared between trees and
+  agents.
+  """
+  def __init__(self, board, player, c, max_nodes=None, playouts_per_leaf=1, rng=None, symmetric=False,
+      cache=None, cache_min_playouts=32, capacity=1024):
+    # who made the last move at the root
+    self.root_player = player
+    self.c = c
+    self.max_nodes = max_nodes
+    # more than one playout per leaf runs them as one batch
+    self.playouts_per_leaf = playouts_per_leaf
+    # np.random or a seeded RandomState
+    self.rng = np.random if rng is None else rng
+    self.symmetric = symmetric
+    # PositionCache of [playouts, X wins, O wins] per position; once a
+    # position has cache_min_playouts playouts, new ones are drawn from
+    # its results instead of being played
+    self.cache = cache
+    self.cache_min_playouts = cache_min_playouts
+    self.board = board.copy()
+    dim = board.dim
+    self.cells = dim * dim
+    self.move_tuples = [move for local_moves in board.moves for move in local_moves]
+
+    self.visits = np.zeros(capacity, dtype=np.int64)
+    self.wins = np.zeros(capacity, dtype=np.int64)
+    self.ties = np.zeros(capacity, dtype=np.int64)
+    self.parent = np.full(capacity, -1, dtype=np.int32)
+    self.first_child = np.full(capacity, -1, dtype=np.int32)
+    self.num_children = np.zeros(capacity, dtype=np.int32)
+    # flat index g * dim * dim + c of the move that led to the node
+    self.move = np.full(capacity, -1, dtype=np.int32)
+    # who made the move that led to the node
+    self.player = np.zeros(capacity, dtype=np.int8)
+    self.player[0] = player
+    self.size = 1
+    self.batching = False
+
+  def encode_move(self, move):
+    dim = self.board.dim
+    return (int(move[0]) * dim + int(move[1])) * self.cells + int(move[2]) * dim + int(move[3])
+
+  def decode_move(self, index):
+    return self.move_tuples[index]
+
+  def _grow(self, needed):
+    capacity = self.visits.shape[0]
+    if needed <= capacity:
+      return
+    while capacity < needed:
+      capacity *= 2
+    for name in ("visits", "wins", "ties", "parent", "first_child", "num_children", "move", "player"):
+      old = getattr(self, name)
+      new = np.full(capacity, -1 if name in ("parent", "first_child", "move") else 0, dtype=old.dtype)
+      new[:self.size] = old[:self.size]
+      setattr(self, name, new)
+
+  def best_child(self, node):
+    """
+    Returns the child of node with the highest UCT value, or -1 if node
+    has no children. Unvisited children come first, and ties go to the
+    child with the lowest id.
+    """
+    count = self.num_children[node]
+    if count == 0:
+      return -1
+    first = self.first_child[node]
+    last = first + count
+    n = self.visits[first:last]
+    unvisited = n == 0
+    if unvisited.any():
+      return first + int(unvisited.argmax())
+
+    # all children are visited, so log(N) is defined and shared by all
+    log_N = math.log(self.visits[node])
+    scores = (self.wins[first:last] + .5 * self.ties[first:last]) / n
+    scores += self.c * np.sqrt(log_N / n)
+    return first + int(scores.argmax())
+
+  def select(self):
+    """
+    Plays the moves down to the node to do a game from on the working
+    board, expanding it if it was visited before. Returns the node and the
+    number of moves played.
+    """
+    board = self.board
+    played = 0
+
+    # traverse the tree to find the next node to do a game from
+    node = 0
+    while self.num_children[node] > 0:
+      node = self.best_child(node)
+      board.move(self.move_tuples[self.move[node]], int(self.player[node]))
+      played += 1
+
+    if board.result == 0 and self.visits[node] > 0:
+      node = self.expand(node, board)
+      board.move(self.move_tuples[self.move[node]], int(self.player[node]))
+      played += 1
+
+    return node, played
+
+  def iterate(self):
+    """
+    Runs one selection, expansion, playout and backpropagation step.
+    """
+    node, played = self.select()
+    if self.playouts_per_leaf > 1:
+      results = batch_random_playouts(self.board, int(self.player[node]), self.playouts_per_leaf, self.rng)
+      self._take_back(played)
+      self.backpropogate_batch(node, results)
+      return
+    result = self.playout(node)
+    self._take_back(played)
+    self.backpropogate(node, result)
+
+  def playout(self, node):
+    """
+    Returns the result of a random game from node's position on the
+    working board.
+    """
+    if self.cache is None:
+      return random_playout(self.board, int(self.player[node]), self.rng)
+    key = self.board.key
+    stats = self.cache.get(key)
+    if stats is not None and stats[0] >= self.cache_min_playouts:
+      # the position is well estimated, draw a result from its playouts
+      draw = self.rng.randint(stats[0])
+      if draw < stats[1]:
+        return 1
+      return -1 if draw < stats[1] + stats[2] else -2
+    result = random_playout(self.board, int(self.player[node]), self.rng)
+    if stats is None:
+      stats = [0, 0, 0]
+      self.cache.put(key, stats)
+    stats[0] += 1
+    if result == 1:
+      stats[1] += 1
+    elif result == -1:
+      stats[2] += 1
+    return result
+
+  def search(self, max_time=None, max_iterations=None, pool=None, batch_size=1, stop=None):
+    """
+    Iterates until max_time seconds have passed, max_iterations iterations
+    have run or the threading.Event stop is set, whichever comes first, in
+    batches on pool if given. Returns the number of iterations run.
+    """
+    time_s = time.time()
+    iterations = 0
+    while ((max_time is None or (time.time() - time_s) < max_time)
+        and (max_iterations is None or iterations < max_iterations)
+        and (stop is None or not stop.is_set())):
+      if pool is not None:
+        size = batch_size if max_iterations is None else min(batch_size, max_iterations - iterations)
+        self.iterate_batch(pool, size)
+        iterations += size
+      else:
+        self.iterate()
+        iterations += 1
+    return iterations
+
+  def iterate_batch(self, pool, batch_size):
+    """
+    Selects batch_size leaves and plays them out in parallel on pool.
+    Every selected path gets its visit counted right away as a virtual
+    loss, so the following selections of the batch spread out.
+    """
+    self.batching = True
+    leaves = []
+    tasks = []
+    for _ in range(batch_size):
+      node, played = self.select()
+      tasks.append((self.board.copy(), int(self.player[node]), self.rng.randint(2**31)))
+      self._take_back(played)
+      self.add_visit(node)
+      leaves.append(node)
+    self.batching = False
+
+    for node, result in zip(leaves, pool.map(_playout_task, tasks)):
+      self.backpropogate(node, result, count_visit=False)
+    if self.max_nodes is not None and self.size > self.max_nodes:
+      self.prune()
+
+  def _take_back(self, played):
+    for _ in range(played):
+      self.board.undo_move(self.board.history[-1])
+
+  def expand(self, node, board):
+    """
+    Adds every move from node's position as a child and returns a random
+    one of them.
+    """
+    moves = board.availible_moves()
+    if self.symmetric and piece_symmetries(board):
+      moves = self.distinct_moves(board, moves, -int(self.player[node]))
+    # node ids of a batch must stay valid until it is backpropagated, so
+    # batches only prune once they are done
+    if not self.batching and self.max_nodes is not None and self.size + len(moves) > self.max_nodes:
+      node = self.prune(node)
+    self._grow(self.size + len(moves))
+
+    first = self.size
+    last = first + len(moves)
+    self.first_child[node] = first
+    self.num_children[node] = len(moves)
+    self.visits[first:last] = 0
+    self.wins[first:last] = 0
+    self.ties[first:last] = 0
+    self.first_child[first:last] = -1
+    self.num_children[first:last] = 0
+    self.parent[first:last] = node
+    self.player[first:last] = -self.player[node]
+    self.move[first:last] = [self.encode_move(move) for move in moves]
+    self.size = last
+    return self.rng.randint(first, last)
+
+  def distinct_moves(self, board, moves, player):
+    """
+    Returns the first of every group of moves of player leading to
+    equivalent positions.
+    """
+    seen = set()
+    distinct = []
+    for move in moves:
+      board.move(move, player)
+      key, _ = canonical_key(board)
+      board.undo_move(move)
+      if key not in seen:
+        seen.add(key)
+        distinct.append(move)
+    return distinct
+
+  def add_visit(self, node):
+    while node != -1:
+      self.visits[node] += 1
+      node = self.parent[node]
+
+  def backpropogate(self, node, winner, count_visit=True):
+    while node != -1:
+      if count_visit:
+        self.visits[node] += 1
+      if winner == -2:
+        self.ties[node] += 1
+      elif self.player[node] == winner:
+        self.wins[node] += 1
+      node = self.parent[node]
+
+  def backpropogate_batch(self, node, results):
+    x_wins = int(np.count_nonzero(results == 1))
+    o_wins = int(np.count_nonzero(results == -1))
+    ties = results.shape[0] - x_wins - o_wins
+    while node != -1:
+      self.visits[node] += results.shape[0]
+      self.ties[node] += ties
+      self.wins[node] += x_wins if self.player[node] == 1 else o_wins
+      node = self.parent[node]
+
+  def root_stats(self):
+    """
+    Returns the moves of the root's children with their visits, wins and
+    ties.
+    """
+    first = self.first_child[0]
+    last = first + self.num_children[0]
+    moves = [self.move_tuples[move] for move in self.move[first:last]]
+    return moves, self.visits[first:last].tolist(), self.wins[first:last].tolist(), self.ties[first:last].tolist()
+
+  def prune(self, keep=0):
+    """
+    Drops the children of the least visited nodes until the tree is at
+    most half of max_nodes, and returns the new id of node keep, whose
+    path from the root is never pruned.
+    """
+    path = set()
+    node = keep
+    while node != -1:
+      path.add(int(node))
+      node = self.parent[node]
+
+    threshold = 2
+    while True:
+      order = self._compact_order(0, lambda node: node in path or self.visits[node] >= threshold)
+      if len(order) <= self.max_nodes // 2 or threshold > self.visits[0]:
+        break
+      threshold *= 2
+    new_ids = self._compact(order)
+    return new_ids[keep]
+
+  def reroot(self, node):
+    """
+    Makes node the root, dropping every node outside its subtree, and
+    plays its move on the root board.
+    """
+    self.board.move(self.move_tuples[self.move[node]], int(self.player[node]))
+    self.root_player = int(self.player[node])
+    self._compact(self._compact_order(node, lambda node: True))
+    self.parent[0] = -1
+    self.move[0] = -1
+    self._shrink()
+
+  def _shrink(self):
+    # gives the memory of dropped nodes back once the tree uses less than
+    # a quarter of its arrays
+    capacity = self.visits.shape[0]
+    if capacity <= 1024 or self.size * 4 > capacity:
+      return
+    capacity = max(1024, 2 * self.size)
+    for name in ("visits", "wins", "ties", "parent", "first_child", "num_children", "move", "player"):
+      setattr(self, name, getattr(self, name)[:capacity].copy())
+
+  def _compact_order(self, root, expand):
+    # nodes of the subtree of root in breadth-first order, keeping the
+    # children of a node only if expand(node)
+    order = [root]
+    i = 0
+    while i < len(order):
+      node = order[i]
+      i += 1
+      if self.num_children[node] > 0 and expand(node):
+        first = self.first_child[node]
+        order.extend(range(first, first + self.num_children[node]))
+    return order
+
+  def _compact(self, order):
+    # rebuilds the arrays with only the nodes in order, renumbered by their
+    # position in it, and returns the old -> new id mapping
+    new_ids = np.full(self.size, -1, dtype=np.int32)
+    order = np.array(order, dtype=np.int32)
+    new_ids[order] = np.arange(order.shape[0], dtype=np.int32)
+
+    for name in ("visits", "wins", "ties", "move", "player", "parent", "first_child", "num_children"):
+      values = getattr(self, name)
+      values[:order.shape[0]] = values[order]
+    kept_parent = self.parent[:order.shape[0]]
+    self.parent[:order.shape[0]] = np.where(kept_parent >= 0, new_ids[kept_parent], -1)
+    kept_first = self.first_child[:order.shape[0]]
+    first = np.where(kept_first >= 0, new_ids[kept_first], -1)
+    # children that were not kept leave their parent a leaf
+    self.num_children[:order.shape[0]][first < 0] = 0
+    self.first_child[:order.shape[0]] = first
+    self.size = order.shape[0]
+    return new_ids
+
+  def child_by_move(self, node, move):
+    """
+    Returns the child of node reached by a (gi, gj, ci, cj) move, or -1.
+    """
+    first = self.first_child[node]
+    found = np.flatnonzero(self.move[first:first + self.num_children[node]] == self.encode_move(move))
+    return first + int(found[0]) if found.size else -1
+
+  def advance(self, board):
+    """
+    Reroots the tree onto board by following the moves played on board
+    since the root position, and returns whether it could: board must
+    continue the root's game and every move must be in the tree.
+    """
+    played = len(self.board.history)
+    if len(board.history) < played or board.history[:played] != self.board.history:
+      return False
+    for index in range(played, len(board.history)):
+      child = self.child_by_move(0, board.played_move(index))
+      if child == -1:
+        return False
+      self.reroot(child)
+    return self.board.key == board.key
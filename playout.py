@@ -0,0 +1,97 @@
+import numpy as np
+from board import Board, OUTCOME_TABLE, POW3
+
+# base 3 digit of the tokens 0, 1 and -1, indexed by token (-1 wraps around)
+_DIGIT = np.array([0, 1, 2], dtype=np.int32)
+_POW3 = np.array(POW3, dtype=np.int32)
+
+def random_playouts(states, win_boards, next_boards, to_move, rng=None):
+  """
+  Plays one random game from each of K independent dim 3 positions in
+  lockstep and returns their K results (1, -1 or -2). The positions are
+  given as stacked (K, 3, 3, 3, 3) states and (K, 3, 3) win boards, with
+  the flat index of the local board each must be played on next (-1 for
+  any) and the player to move. The arrays are not changed.
+  """
+  rng = np.random if rng is None else rng
+  states = np.asarray(states)
+  k = states.shape[0]
+  if states.shape[1:] != (3, 3, 3, 3):
+    raise ValueError("batched playouts need dim 3 positions, not states of shape {}".format(states.shape[1:]))
+  state = states.reshape((k, 9, 9))
+  win_boards = np.asarray(win_boards).reshape((k, 9))
+
+  # one row per game
+  empty = state == 0
+  codes = np.dot(_DIGIT[state], _POW3)
+  local = win_boards.copy()
+  wins = np.where(np.abs(win_boards) == 1, win_boards, 0)
+  win_code = np.dot(_DIGIT[wins], _POW3).astype(np.int32)
+  decided = np.count_nonzero(win_boards, axis=1).astype(np.int32)
+  next_boards = np.array(next_boards, dtype=np.int32)
+  to_move = np.array(to_move, dtype=np.int8)
+  results = OUTCOME_TABLE[win_code]
+  results = np.where((results == 0) & (decided == 9), -2, results).astype(np.int8)
+
+  active = np.nonzero(results == 0)[0]
+  while active.size:
+    n = active.size
+    rows = np.arange(n)
+
+    # local boards each game may play on
+    playable = local[active] == 0
+    nxt = next_boards[active]
+    forced = (nxt >= 0) & playable[rows, np.maximum(nxt, 0)]
+    only_next = np.zeros_like(playable)
+    only_next[rows[forced], nxt[forced]] = True
+    playable = np.where(forced[:, None], only_next, playable)
+
+    # a uniformly random legal move per game
+    legal = (empty[active] & playable[:, :, None]).reshape((n, 81))
+    choice = np.argmax(rng.random((n, 81)) * legal, axis=1)
+    g = choice // 9
+    c = choice % 9
+
+    players = to_move[active]
+    empty[active, g, c] = False
+    codes[active, g] += _DIGIT[players] * _POW3[c]
+    new_local = OUTCOME_TABLE[codes[active, g]]
+    local[active, g] = new_local
+
+    closed = new_local != 0
+    decided[active[closed]] += 1
+    won = (new_local == 1) | (new_local == -1)
+    win_code[active[won]] += _DIGIT[new_local[won]] * _POW3[g[won]]
+
+    outcome = OUTCOME_TABLE[win_code[active]]
+    outcome = np.where((outcome == 0) & (decided[active] == 9), -2, outcome)
+    results[active] = outcome
+    next_boards[active] = c
+    to_move[active] = -players
+    active = active[outcome == 0]
+
+  return results
+
+def batch_random_playouts(board, player, k, rng=None):
+  """
+  Plays k independent random games from board in lockstep, player having
+  made the last move, and returns their k results (1, -1 or -2). board
+  itself is not changed. Only dim 3 boards are supported.
+  """
+  if board.dim != 3:
+    raise ValueError("batched playouts need a dim 3 board, not dim {}".format(board.dim))
+  if board.result != 0:
+    return np.full(k, board.result, dtype=np.int8)
+  if board.next_board == (None, None):
+    next_board = -1
+  else:
+    next_board = board.next_board[0] * 3 + board.next_board[1]
+  states = np.broadcast_to(board.get_state(), (k, 3, 3, 3, 3))
+  win_boards = np.broadcast_to(board.get_win_board(), (k, 3, 3))
+  return random_playouts(states, win_boards, np.full(k, next_board), np.full(k, -player), rng)
+
+def batch_random_games(k, rng=None):
+  """
+  Returns the results of k random games from the empty board.
+  """
+  return batch_random_playouts(Board(3), -1, k, rng)
@@ -0,0 +1,198 @@
+import mmap
+import os
+import struct
+import time
+import numpy as np
+from board import Board
+
+# A record file is a sequence of game records appended one after the
+# other. A record is a header, the labels of the X and O agents in UTF-8,
+# one code per move, then the seconds (float32) and the nodes (uint32)
+# every move took. A move (gi, gj, ci, cj) is coded as g * dim**2 + c with
+# g = gi * dim + gj and c = ci * dim + cj, in one byte up to dim 4 and two
+# beyond. Seeds that are None are stored as -1.
+MAGIC = b"UTG1"
+# magic, record length in bytes, dim, result, moves, game seed, X seed,
+# O seed, X label length, O label length
+_HEADER = struct.Struct("<4sIBbHqqqHH")
+
+def _move_dtype(dim):
+  return np.dtype("u1") if dim ** 4 <= 256 else np.dtype("<u2")
+
+def encode_move(move, dim=3):
+  return ((int(move[0]) * dim + int(move[1])) * dim + int(move[2])) * dim + int(move[3])
+
+def decode_move(code, dim=3):
+  code = int(code)
+  return (code // dim ** 3, code // dim ** 2 % dim, code // dim % dim, code % dim)
+
+def _seed(seed):
+  return -1 if seed is None else int(seed)
+
+def encode_record(record):
+  """
+  Returns the bytes of a game record, a dict with the dim, the result,
+  the moves, the agents and seeds keyed by player, the game seed and the
+  times and nodes of the moves.
+  """
+  dim = record["dim"]
+  labels = [record["agents"][player].encode("utf-8") for player in (1, -1)]
+  moves = np.array([encode_move(move, dim) for move in record["moves"]], dtype=_move_dtype(dim))
+  times = np.asarray(record["times"], dtype="<f4")
+  nodes = np.asarray(record["nodes"], dtype="<u4")
+  body = b"".join(labels) + moves.tobytes() + times.tobytes() + nodes.tobytes()
+  header = _HEADER.pack(MAGIC, _HEADER.size + len(body), dim, record["result"], len(moves),
+    _seed(record.get("game_seed")), _seed(record["seeds"][1]), _seed(record["seeds"][-1]),
+    len(labels[0]), len(labels[1]))
+  return header + body
+
+def decode_record(buffer, offset=0):
+  """
+  Returns the game record starting at offset in buffer, with the times
+  and nodes as arrays viewing buffer.
+  """
+  magic, length, dim, result, num_moves, game_seed, x_seed, o_seed, x_len, o_len = \
+    _HEADER.unpack_from(buffer, offset)
+  if magic != MAGIC:
+    raise ValueError("no game record at offset {}".format(offset))
+  offset += _HEADER.size
+  x_label = bytes(buffer[offset:offset + x_len]).decode("utf-8")
+  offset += x_len
+  o_label = bytes(buffer[offset:offset + o_len]).decode("utf-8")
+  offset += o_len
+  move_dtype = _move_dtype(dim)
+  codes = np.frombuffer(buffer, move_dtype, num_moves, offset)
+  offset += num_moves * move_dtype.itemsize
+  times = np.frombuffer(buffer, "<f4", num_moves, offset)
+  nodes = np.frombuffer(buffer, "<u4", num_moves, offset + 4 * num_moves)
+  seeds = [None if seed == -1 else seed for seed in (game_seed, x_seed, o_seed)]
+  return {
+    "dim": dim,
+    "result": result,
+    "moves": [decode_move(code, dim) for code in codes.tolist()],
+    "agents": {1: x_label, -1: o_label},
+    "seeds": {1: seeds[1], -1: seeds[2]},
+    "game_seed": seeds[0],
+    "times": times,
+    "nodes": nodes,
+  }
+
+def append_record(path, record):
+  """
+  Appends a game record to the file at path, in one write so records of
+  processes appending to the same file don't interleave.
+  """
+  with open(path, "ab") as f:
+    f.write(encode_record(record))
+
+def read_records(path):
+  """
+  Yields the game records of the file at path one at a time, reading only
+  the record being yielded. A record cut short by an interrupted write
+  ends the file.
+  """
+  with open(path, "rb") as f:
+    while True:
+      header = f.read(_HEADER.size)
+      if len(header) < _HEADER.size:
+        return
+      length = _HEADER.unpack(header)[1]
+      body = f.read(length - _HEADER.size)
+      if len(body) < length - _HEADER.size:
+        return
+      yield decode_record(header + body)
+
+class GameRecords(object):
+  """
+  Random access to the game records of a file, memory-mapped so only the
+  records read are paged in. Finding where records start reads every
+  header once, when the file is opened.
+  """
+  def __init__(self, path):
+    self.path = path
+    size = os.path.getsize(path)
+    self.file = open(path, "rb")
+    self.buffer = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+    offsets = []
+    offset = 0
+    while offset + _HEADER.size <= size:
+      length = _HEADER.unpack_from(self.buffer, offset)[1]
+      if offset + length > size:
+        break
+      offsets.append(offset)
+      offset += length
+    self.offsets = np.array(offsets, dtype=np.int64)
+
+  def __len__(self):
+    return len(self.offsets)
+
+  def __getitem__(self, index):
+    return decode_record(self.buffer, int(self.offsets[index]))
+
+  def __iter__(self):
+    for offset in self.offsets.tolist():
+      yield decode_record(self.buffer, offset)
+
+  def close(self):
+    # views of the buffer handed out must be gone before it can be closed
+    if isinstance(self.buffer, mmap.mmap):
+      self.buffer.close()
+    self.file.close()
+
+def replay(record):
+  """
+  Yields the board after every move of a game record, X moving first.
+  """
+  board = Board(record["dim"])
+  player = 1
+  for move in record["moves"]:
+    board.move(move, player)
+    player = -player
+    yield board
+
+def describe_agent(agent):
+  """
+  Returns a label naming the class of agent and its search budget.
+  """
+  params = ["{}={}".format(name, getattr(agent, name)) for name in ("max_time", "max_nodes", "max_iterations", "c")
+    if getattr(agent, name, None) is not None]
+  return "{}({})".format(type(agent).__name__, ", ".join(params))
+
+class GameRecorder(object):
+  """
+  Collects the moves of one game between agents, keyed by player, with
+  what each move took, and turns them into a game record.
+  """
+  def __init__(self, ais, dim=3, labels=None, game_seed=None):
+    self.dim = dim
+    self.labels = labels if labels is not None else {player: describe_agent(ai) for player, ai in ais.items()}
+    self.seeds = {player: getattr(ai, "seed", None) for player, ai in ais.items()}
+    self.game_seed = game_seed
+    self.moves = []
+    self.times = []
+    self.nodes = []
+
+  def make_move(self, ai, board):
+    """
+    Lets ai make its move on board and records it; returns the move.
+    """
+    time_s = time.time()
+    move = ai.make_move(board)
+    self.times.append(time.time() - time_s)
+    info = getattr(ai, "search_info", {})
+    # playouts are the work of an MCTS search, its nodes are the tree size
+    self.nodes.append(info.get("playouts", info.get("nodes", 0)))
+    self.moves.append(move)
+    return move
+
+  def record(self, result):
+    return {
+      "dim": self.dim,
+      "result": result,
+      "moves": self.moves,
+      "agents": self.labels,
+      "seeds": self.seeds,
+      "game_seed": self.game_seed,
+      "times": self.times,
+      "nodes": self.nodes,
+    }
@@ -0,0 +1,137 @@
+import numpy as np
+
+# The 8 symmetries of the square act on the global and the local indices
+# of a board at the same time. Symmetry s sends cell k = i * dim + j of a
+# dim x dim board to cell CELL_MAPS[dim][s][k], so move (gi, gj, ci, cj)
+# goes to the images of g = gi * dim + gj and c = ci * dim + cj.
+_CELL_MAPS = {}
+
+def cell_maps(dim):
+  """
+  Returns the cell permutation of each of the 8 symmetries of a dim x dim
+  board, the identity first.
+  """
+  if dim not in _CELL_MAPS:
+    last = dim - 1
+    transforms = [
+      lambda i, j: (i, j),
+      lambda i, j: (j, last - i),
+      lambda i, j: (last - i, last - j),
+      lambda i, j: (last - j, i),
+      lambda i, j: (i, last - j),
+      lambda i, j: (last - i, j),
+      lambda i, j: (j, i),
+      lambda i, j: (last - j, last - i),
+    ]
+    maps = []
+    for transform in transforms:
+      cells = []
+      for k in range(dim * dim):
+        i, j = transform(k // dim, k % dim)
+        cells.append(i * dim + j)
+      maps.append(cells)
+    _CELL_MAPS[dim] = maps
+  return _CELL_MAPS[dim]
+
+_INVERSES = {}
+
+def inverse(dim, s):
+  """
+  Returns the symmetry undoing symmetry s.
+  """
+  if (dim, s) not in _INVERSES:
+    maps = cell_maps(dim)
+    undo = [0] * (dim * dim)
+    for k, image in enumerate(maps[s]):
+      undo[image] = k
+    _INVERSES[dim, s] = maps.index(undo)
+  return _INVERSES[dim, s]
+
+def inverse_move(move, s, dim=3):
+  """
+  Returns the move that symmetry s sends to move, mapping a move found on
+  an image of a board back to the board.
+  """
+  return transform_move(move, inverse(dim, s), dim)
+
+def transform_move(move, s, dim=3):
+  """
+  Returns the image of a (gi, gj, ci, cj) move under symmetry s.
+  """
+  cells = cell_maps(dim)[s]
+  g = cells[int(move[0]) * dim + int(move[1])]
+  c = cells[int(move[2]) * dim + int(move[3])]
+  return (g // dim, g % dim, c // dim, c % dim)
+
+_MASK = (1 << 64) - 1
+
+def symmetric_keys(board):
+  """
+  Returns the Zobrist keys of the 8 images of board, unpacked from
+  board.sym_key, so the first one is board.key.
+  """
+  sym_key = board.sym_key
+  return [(sym_key >> shift) & _MASK for shift in range(0, 512, 64)]
+
+def canonical_key(board):
+  """
+  Returns the smallest key of the images of board and the symmetry that
+  sends board to that image.
+  """
+  keys = symmetric_keys(board)
+  s = keys.index(min(keys))
+  return keys[s], s
+
+def piece_symmetries(board):
+  """
+  Returns the symmetries other than the identity that leave the pieces of
+  board where they are, whatever its next_board. Moves that are images of
+  each other under one of them lead to equivalent positions.
+  """
+  dim = board.dim
+  if board.next_board == (None, None):
+    next_cell = dim * dim
+  else:
+    next_cell = board.next_board[0] * dim + board.next_board[1]
+  # the packed keys without their next_board part
+  pieces = board.sym_key ^ board.sym_next_keys[next_cell]
+  keys = [(pieces >> shift) & _MASK for shift in range(0, 512, 64)]
+  return [s for s in range(1, 8) if keys[s] == keys[0]]
+
+def transform_positions(states, win_boards, s):
+  """
+  Returns the images under symmetry s of stacked (N, dim, dim, dim, dim)
+  states and (N, dim, dim) win boards.
+  """
+  dim = win_boards.shape[-1]
+  n = dim * dim
+  # cell k of the image holds cell undo[k] of the original
+  undo = cell_maps(dim)[inverse(dim, s)]
+  flat = states.reshape((-1, n, n))[:, undo][:, :, undo]
+  return flat.reshape(states.shape), win_boards.reshape((-1, n))[:, undo].reshape(win_boards.shape)
+
+def transform_state(state, s):
+  """
+  Returns the image under symmetry s of one 4-D board array.
+  """
+  dim = state.shape[0]
+  images, _ = transform_positions(state[None], np.zeros((1, dim, dim), dtype=state.dtype), s)
+  return images[0]
+
+def canonical_state(state):
+  """
+  Returns the image of a 4-D board array that comes first in byte order
+  and the symmetry giving it, for keying positions by their contents.
+  """
+  images = [transform_state(state, s) for s in range(8)]
+  raw = [image.tobytes() for image in images]
+  s = raw.index(min(raw))
+  return images[s], s
+
+def symmetric_positions(states, win_boards):
+  """
+  Returns stacked positions with their 8 images, for datasets whose
+  fitted weights should not depend on the orientation of the board.
+  """
+  images = [transform_positions(states, win_boards, s) for s in range(8)]
+  return np.concatenate([image[0] for image in images]), np.concatenate([image[1] for image in images])
@@ -0,0 +1,275 @@
+from board import *
+from agents import *
+from heuristics import *
+from book import OpeningBook
+from cache import PositionCache, load_cache
+from records import GameRecorder, encode_record
+import json
+import os
+import random
+import zlib
+import multiprocessing
+import multiprocessing.util
+
+# an agent spec is a dict naming the agent type and its arguments, e.g.
+# {"type": "mcts", "max_time": .2, "c": 1} or
+# {"type": "minmax", "max_time": .1, "heuristic": "attack"}. Giving
+# searches a max_nodes or max_iterations budget and max_time None makes
+# results independent of the machine and its load. A minmax spec can add
+# "weights": a weight file written by tuning.py, and minmax and mcts specs
+# a "book": an opening book file written by build_book.py, and "cache":
+# True to share the process's PositionCache (see open_cache) for heuristic
+# values or playout results. Tournament games already run on every core in
+# daemonic pool workers, which can't start processes of their own, so
+# run_tournament rejects specs with a "parallel" MCTS mode.
+HEURISTICS = {
+  "plus": lambda player, w: plus_heuristic_fun(w["local_h"], w["global_h"], player),
+  "plus_neg": lambda player, w: plus_neg_heuristic_fun(w["local_h"], w["global_h"], player),
+  "attack": lambda player, w: attack_heuristic_fun(w["local_h"], w["attack_h"], player),
+}
+
+# books opened by this process, by path
+_BOOKS = {}
+
+def open_book(path):
+  if path not in _BOOKS:
+    _BOOKS[path] = OpeningBook(path)
+  return _BOOKS[path]
+
+# cache of this process; a tournament worker saves it as a shard of the
+# path it was opened with every CACHE_SAVE_EVERY games and when it exits
+_CACHE = None
+_CACHE_PATH = None
+CACHE_SAVE_EVERY = 25
+_unsaved_games = 0
+
+def open_cache(path=None, max_size=2**18):
+  """
+  Returns the cache of this process, loading it from path the first time
+  if a file is there.
+  """
+  global _CACHE, _CACHE_PATH
+  if _CACHE is None:
+    _CACHE = PositionCache(max_size) if path is None else load_cache(path, max_size)
+    _CACHE_PATH = path
+  return _CACHE
+
+def save_cache_shard():
+  global _unsaved_games
+  if _CACHE is not None and _CACHE_PATH is not None and _unsaved_games:
+    # each worker keeps its own copy, merged by merge_cache_shards
+    _CACHE.save("{}.{}".format(_CACHE_PATH, os.getpid()))
+    _unsaved_games = 0
+
+def init_worker(cache_path):
+  """
+  Opens the cache of a tournament worker and has it saved when the worker
+  exits after the pool is closed; a terminated worker only keeps what its
+  last periodic save wrote.
+  """
+  open_cache(cache_path)
+  if cache_path is not None:
+    multiprocessing.util.Finalize(None, save_cache_shard, exitpriority=10)
+
+def cache_shards(path, suffix=""):
+  directory = os.path.dirname(path) or "."
+  prefix = os.path.basename(path) + "."
+  return [os.path.join(directory, name) for name in os.listdir(directory)
+    if name.startswith(prefix) and name.endswith(suffix)
+    and name[len(prefix):len(name) - len(suffix)].replace(".", "").isdigit()]
+
+def merge_cache_shards(path, max_size=2**18):
+  """
+  Merges the caches saved by the workers of a tournament into the cache
+  at path and removes them.
+  """
+  # left by saves that were killed before they finished
+  for tmp_path in cache_shards(path, ".tmp"):
+    os.remove(tmp_path)
+  shards = cache_shards(path)
+  if not shards:
+    return
+  cache = load_cache(path, max_size)
+  for shard in shards:
+    cache.merge(load_cache(shard, max_size))
+  cache.save(path)
+  for shard in shards:
+    os.remove(shard)
+
+def make_agent(spec, player, seed=None, dim=3):
+  """
+  Returns a fresh agent for player on a dim x dim board built from an
+  agent spec, seeded with seed unless the spec has its own.
+  """
+  args = dict(spec)
+  args.setdefault("seed", seed)
+  kind = args.pop("type")
+  if "book" in args:
+    args["book"] = open_book(args["book"])
+  cache = open_cache() if args.pop("cache", False) else None
+  if kind == "random":
+    return RandomAgent(player, **args)
+  elif kind == "mcts":
+    return TimedMCTSAgent(player, cache=cache, **args)
+  elif kind == "minmax":
+    weights_path = args.pop("weights", None)
+    if weights_path is None:
+      weights = default_weights(dim)
+    else:
+      weights = load_weights(weights_path)
+    name = args.pop("heuristic")
+    heuristic = HEURISTICS[name](player, weights)
+    if cache is not None:
+      heuristic = cached_heuristic_fun(heuristic, cache, (name, weights_path, player))
+    return TimedMinmaxAgent(player, heuristic=heuristic, end_value=end_value, **args)
+  raise ValueError("unknown agent type {!r}".format(kind))
+
+def pairing(label, player_spec, player, opponent_spec, dim=3):
+  """
+  Returns a pairing of the agent scored by label, playing as player,
+  against an opponent on a dim x dim board.
+  """
+  return {"label": label, "player": player, "player_spec": player_spec, "opponent_spec": opponent_spec, "dim": dim}
+
+def play_game(job):
+  """
+  Plays game number game of a pairing with freshly built agents and
+  returns a result record with the outcome for the scored agent. When the
+  job asks for it, the record also holds the encoded game record under
+  "game_record".
+  """
+  match, game = job[:2]
+  keep_record = len(job) > 2 and job[2]
+  time_s = time.time()
+  # every game gets its own random stream, whatever worker runs it
+  seed = zlib.crc32("{}:{}".format(match["label"], game).encode())
+  np.random.seed(seed)
+  random.seed(seed)
+
+  player = match["player"]
+  dim = match.get("dim", 3)
+  ais = {
+    player: make_agent(match["player_spec"], player, seed, dim),
+    -player: make_agent(match["opponent_spec"], -player, seed + 1, dim),
+  }
+  board = Board(dim)
+  labels = {player: json.dumps(match["player_spec"], sort_keys=True),
+    -player: json.dumps(match["opponent_spec"], sort_keys=True)}
+  recorder = GameRecorder(ais, dim, labels, seed)
+  turn = 1
+  while board.get_outcome() == 0:
+    recorder.make_move(ais[turn], board)
+    turn = -turn
+  for ai in ais.values():
+    if hasattr(ai, "close"):
+      ai.close()
+  global _unsaved_games
+  _unsaved_games += 1
+  if _unsaved_games >= CACHE_SAVE_EVERY:
+    save_cache_shard()
+
+  # 0 -> win
+  # 1 -> loss
+  # 2 -> tie
+  if board.get_outcome() == -2:
+    outcome = 2
+  elif board.get_outcome() == player:
+    outcome = 0
+  else:
+    outcome = 1
+  record = {"label": match["label"], "game": game, "outcome": outcome, "time": time.time() - time_s}
+  if keep_record:
+    record["game_record"] = encode_record(recorder.record(board.get_outcome()))
+  return record
+
+def load_results(results_path):
+  """
+  Returns the result records already written to results_path.
+  """
+  if results_path is None or not os.path.exists(results_path):
+    return []
+  with open(results_path) as f:
+    return [json.loads(line) for line in f if line.strip()]
+
+def run_tournament(pairings, num_games, workers=None, results_path=None, cache_path=None, record_path=None):
+  """
+  Plays num_games games of every pairing on a pool of workers and yields
+  a result record as each game finishes. Records are appended to
+  results_path, and the games already recorded there are not played
+  again, so an interrupted run can be resumed. Agents with a cache start
+  from the one saved at cache_path, which gets what they learn. Every game
+  is appended to record_path as a game record, see records.py.
+  """
+  for match in pairings:
+    for spec in (match["player_spec"], match["opponent_spec"]):
+      if spec.get("parallel") is not None:
+        raise ValueError("pairing {!r}: tournament workers can't run parallel agents, "
+          "drop \"parallel\" from {!r}".format(match["label"], spec))
+  done = set((record["label"], record["game"]) for record in load_results(results_path))
+  jobs = [(match, game, record_path is not None) for match in pairings for game in range(num_games)
+    if (match["label"], game) not in done]
+  if not jobs:
+    return
+
+  if cache_path is not None:
+    # shards left by an interrupted run
+    merge_cache_shards(cache_path)
+  out = open(results_path, "a") if results_path is not None else None
+  games_out = open(record_path, "ab") if record_path is not None else None
+  pool = multiprocessing.Pool(workers, initializer=init_worker, initargs=(cache_path,))
+  try:
+    for record in pool.imap_unordered(play_game, jobs):
+      game_record = record.pop("game_record", None)
+      # the result goes first: a game whose result is written is not played
+      # again on resume, so its record can at worst be missing, never doubled
+      if out is not None:
+        out.write(json.dumps(record) + "\n")
+        out.flush()
+      if games_out is not None:
+        games_out.write(game_record)
+        games_out.flush()
+      yield record
+    # lets the workers exit on their own, saving their caches
+    pool.close()
+    pool.join()
+  finally:
+    pool.terminate()
+    if out is not None:
+      out.close()
+    if games_out is not None:
+      games_out.close()
+    if cache_path is not None:
+      merge_cache_shards(cache_path)
+
+def tally(records, scores=None, times=None):
+  """
+  Adds result records to per-label [wins, losses, ties] arrays, as
+  score_AIs returns them, and to per-label summed game times.
+  """
+  scores = {} if scores is None else scores
+  times = {} if times is None else times
+  for record in records:
+    scores.setdefault(record["label"], np.zeros(3))[record["outcome"]] += 1
+    times[record["label"]] = times.get(record["label"], 0) + record["time"]
+  return scores, times
+
+def print_tournament(pairings, num_games, workers=None, results_path=None, cache_path=None, record_path=None):
+  """
+  Runs a tournament and prints every pairing like print_out_result as
+  soon as all of its games are in. Returns the scores per label.
+  """
+  scores, times = tally(load_results(results_path))
+  for match in pairings:
+    if match["label"] in scores and scores[match["label"]].sum() >= num_games:
+      print_score(match["label"], scores[match["label"]], times[match["label"]])
+
+  for record in run_tournament(pairings, num_games, workers, results_path, cache_path, record_path):
+    tally([record], scores, times)
+    if scores[record["label"]].sum() == num_games:
+      print_score(record["label"], scores[record["label"]], times[record["label"]])
+  return scores
+
+def print_score(label, score, elapsed):
+  print(label)
+  print(score)
+  print(elapsed)
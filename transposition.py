@@ -0,0 +1,92 @@
+# bound types of a stored score
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+class TranspositionTable(object):
+  """
+  Fixed-size table of search results keyed by Board.key.
+
+  Entries live in buckets of two slots. The first slot keeps the deepest
+  result seen for its bucket during the current search generation, the
+  second is always overwritten, so deep results survive while recent
+  shallow ones still get stored.
+  """
+  def __init__(self, size=2**16):
+    # number of buckets, rounded down to a power of two
+    self.buckets = 1 << max(0, int(size).bit_length() - 1)
+    self.mask = self.buckets - 1
+    slots = 2 * self.buckets
+    self.keys = [None] * slots
+    self.depths = [0] * slots
+    self.flags = [EXACT] * slots
+    self.scores = [0] * slots
+    self.moves = [None] * slots
+    # whether the stored result stopped at the depth limit somewhere, or
+    # searched every line to the end of the game
+    self.horizons = [True] * slots
+    self.generations = [0] * slots
+    self.generation = 0
+    self.reset_stats()
+
+  def reset_stats(self):
+    self.probes = 0
+    self.hits = 0
+    self.stores = 0
+    self.overwrites = 0
+
+  def clear(self):
+    self.__init__(self.buckets)
+
+  def new_search(self):
+    """
+    Ages the stored entries, so deep results from earlier moves can be
+    replaced by results of the current one.
+    """
+    self.generation += 1
+
+  def probe(self, key):
+    """
+    Returns (depth, flag, score, move, horizon) stored for key, or None.
+    """
+    self.probes += 1
+    slot = (key & self.mask) << 1
+    if self.keys[slot] != key:
+      slot += 1
+      if self.keys[slot] != key:
+        return None
+    self.hits += 1
+    return self.depths[slot], self.flags[slot], self.scores[slot], self.moves[slot], self.horizons[slot]
+
+  def store(self, key, depth, flag, score, move, horizon=True):
+    self.stores += 1
+    slot = (key & self.mask) << 1
+    if (self.keys[slot] is not None and self.keys[slot] != key
+        and self.depths[slot] > depth and self.generations[slot] == self.generation):
+      # the depth-preferred slot holds a deeper result of this search
+      slot += 1
+    if self.keys[slot] is not None and self.keys[slot] != key:
+      self.overwrites += 1
+    self.keys[slot] = key
+    self.depths[slot] = depth
+    self.flags[slot] = flag
+    self.scores[slot] = score
+    self.moves[slot] = move
+    self.horizons[slot] = horizon
+    self.generations[slot] = self.generation
+
+  def hit_rate(self):
+    return self.hits / self.probes if self.probes else 0.0
+
+  def stats(self):
+    used = sum(1 for key in self.keys if key is not None)
+    return {
+      "slots": len(self.keys),
+      "used": used,
+      "fill": used / len(self.keys),
+      "probes": self.probes,
+      "hits": self.hits,
+      "hit_rate": self.hit_rate(),
+      "stores": self.stores,
+      "overwrites": self.overwrites,
+    }
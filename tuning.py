@@ -0,0 +1,161 @@
+from board import *
+from heuristics import *
+from tournament import make_agent
+from symmetry import symmetric_positions
+import argparse
+import json
+import multiprocessing
+import os
+import zlib
+
+# every family is linear in its weights, so fitting it is a logistic
+# regression of the game outcome on the features of each position, seen
+# from X
+FAMILIES = ("plus", "plus_neg", "attack")
+
+def self_play_game(job):
+  """
+  Plays one game between two agents built from spec and returns the
+  stacked states and win boards of its positions with the outcome.
+  """
+  spec, game, seed = job
+  seed = zlib.crc32("{}:{}".format(seed, game).encode())
+  np.random.seed(seed)
+  ais = {1: make_agent(spec, 1, seed), -1: make_agent(spec, -1, seed + 1)}
+  board = Board(3)
+  boards = []
+  turn = 1
+  while board.result == 0:
+    ais[turn].make_move(board)
+    turn = -turn
+    if board.result == 0:
+      boards.append(board.copy())
+  for ai in ais.values():
+    if hasattr(ai, "close"):
+      ai.close()
+  if not boards:
+    return None
+  states, win_boards = stack_positions(boards)
+  return states, win_boards, board.result
+
+def generate_dataset(num_games, spec, workers=None, seed=0):
+  """
+  Returns the states, win boards and outcomes of every position of
+  num_games self-play games, played on a pool of workers.
+  """
+  pool = multiprocessing.Pool(workers)
+  try:
+    games = pool.map(self_play_game, [(spec, game, seed) for game in range(num_games)])
+  finally:
+    pool.terminate()
+  games = [game for game in games if game is not None]
+  states = np.concatenate([game[0] for game in games])
+  win_boards = np.concatenate([game[1] for game in games])
+  outcomes = np.concatenate([np.full(game[0].shape[0], game[2], dtype=np.int8) for game in games])
+  return states, win_boards, outcomes
+
+def load_dataset(path, num_games, spec, workers=None, seed=0):
+  """
+  Returns the dataset cached at path if it was generated with the same
+  arguments, and otherwise generates it and caches it there.
+  """
+  params = json.dumps({"games": num_games, "spec": spec, "seed": seed}, sort_keys=True)
+  if path is not None and os.path.exists(path):
+    cached = np.load(path)
+    if str(cached["params"]) == params:
+      return cached["states"], cached["win_boards"], cached["outcomes"]
+  states, win_boards, outcomes = generate_dataset(num_games, spec, workers, seed)
+  if path is not None:
+    np.savez_compressed(path, states=states, win_boards=win_boards, outcomes=outcomes, params=params)
+  return states, win_boards, outcomes
+
+def features(family, states, win_boards):
+  """
+  Returns the features of every position for family, one column per
+  weight in the order weights_from_coefficients reads them.
+  """
+  n = states.shape[0]
+  wins = np.where(win_boards == -2, 0, win_boards).reshape((n, 9))
+  if family == "plus":
+    # the X player's view: its pieces, and the local boards O won
+    own = (states == 1).sum(axis=(1, 2)).reshape((n, 9))
+    return np.concatenate((own, -(wins == -1).astype(int)), axis=1).astype(float)
+  cells = states.sum(axis=(1, 2), dtype=np.int64).reshape((n, 9))
+  if family == "plus_neg":
+    return np.concatenate((cells, wins), axis=1).astype(float)
+  sums = wins[:, [[0, 1, 2], [3, 4, 5], [6, 7, 8], [0, 3, 6], [1, 4, 7], [2, 5, 8], [0, 4, 8], [2, 4, 6]]].sum(axis=2)
+  threats = np.stack((np.where(np.abs(sums) == 1, sums, 0).sum(axis=1),
+    np.where(np.abs(sums) == 2, sums, 0).sum(axis=1)), axis=1)
+  return np.concatenate((cells, threats), axis=1).astype(float)
+
+def fit_logistic(X, y, l2=1e-3, iterations=25):
+  """
+  Fits P(y) = sigmoid(X w + b) by Newton's method, y in [0, 1], and
+  returns w and b.
+  """
+  X = np.concatenate((X, np.ones((X.shape[0], 1))), axis=1)
+  w = np.zeros(X.shape[1])
+  penalty = l2 * X.shape[0] * np.eye(X.shape[1])
+  # the intercept is not penalized
+  penalty[-1, -1] = 0
+  for _ in range(iterations):
+    p = 1 / (1 + np.exp(-(X @ w)))
+    gradient = X.T @ (p - y) + penalty @ w
+    hessian = (X * (p * (1 - p))[:, None]).T @ X + penalty
+    step = np.linalg.solve(hessian, gradient)
+    w -= step
+    if np.abs(step).max() < 1e-8:
+      break
+  return w[:-1], w[-1]
+
+def weights_from_coefficients(family, coefficients, scale=1.0):
+  """
+  Returns the weight dict of family for fitted coefficients, multiplied
+  by scale.
+  """
+  coefficients = coefficients * scale
+  weights = {"family": family, "local_h": coefficients[:9].reshape((3, 3)).tolist()}
+  if family == "attack":
+    weights["attack_h"] = coefficients[9:11].tolist()
+  else:
+    weights["global_h"] = coefficients[9:18].reshape((3, 3)).tolist()
+  return weights
+
+def tune(family, states, win_boards, outcomes, l2=1e-3, symmetrize=False):
+  """
+  Fits the weights of family to predict the outcomes of the positions,
+  draws counting as half a win, and returns them scaled so the largest
+  is as large as the largest hand-picked weight. With symmetrize, every
+  position is also used in its 8 orientations, which makes the fitted
+  weights symmetric.
+  """
+  if symmetrize:
+    states, win_boards = symmetric_positions(states, win_boards)
+    outcomes = np.tile(outcomes, 8)
+  y = np.where(outcomes == 1, 1., np.where(outcomes == -1, 0., .5))
+  coefficients, _ = fit_logistic(features(family, states, win_boards), y, l2)
+  largest = np.abs(coefficients).max()
+  scale = global_h.max() / largest if largest > 0 else 1.0
+  return weights_from_coefficients(family, coefficients, scale)
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="Fit heuristic weights to self-play outcomes.")
+  parser.add_argument("--family", choices=FAMILIES, default="attack", help="heuristic family to fit")
+  parser.add_argument("--games", type=int, default=200, help="self-play games in the dataset")
+  parser.add_argument("--iterations", type=int, default=200, help="MCTS iterations per self-play move")
+  parser.add_argument("--seed", type=int, default=0, help="seed of the self-play games")
+  parser.add_argument("--workers", type=int, default=os.cpu_count(), help="processes playing games")
+  parser.add_argument("--dataset", default="tuning_positions.npz", help="dataset cache")
+  parser.add_argument("--l2", type=float, default=1e-3, help="L2 penalty per position")
+  parser.add_argument("--symmetrize", action="store_true", help="fit on all 8 orientations of every position")
+  parser.add_argument("--out", default=None, help="weight file, <family>_weights.json by default")
+  args = parser.parse_args()
+
+  spec = {"type": "mcts", "max_time": None, "max_iterations": args.iterations, "c": 1}
+  states, win_boards, outcomes = load_dataset(args.dataset, args.games, spec, args.workers, args.seed)
+  weights = tune(args.family, states, win_boards, outcomes, args.l2, args.symmetrize)
+  out = args.out or "{}_weights.json".format(args.family)
+  with open(out, "w") as f:
+    json.dump(weights, f, indent=2)
+  print("fitted on {} positions, written to {}".format(states.shape[0], out))
+  print(json.dumps(weights, indent=2))